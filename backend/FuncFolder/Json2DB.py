@@ -1,216 +1,371 @@
+import asyncio
+import hashlib
 import json
-from supabase import create_client, Client
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Iterator
 
-url: str = "https://iofbbgeonizbqvvntely.supabase.co"
-key: str = "sb_publishable_d8ETrLfDZDFCqKT58AdOUQ_e3n5LHnU"
-supabase: Client = create_client(url, key)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ingest import Batch, PipelineStats, Throughput, run_pipeline, with_retries
+from ingest_manifest import Checkpoint, Manifest, file_version, fingerprint
+from json_stream import iter_json_array
+from places import PlaceIndex, normalize_name
+from repository import WRITE_CHUNK, Repository, create_repository
 
 # ── File paths ──
 LOCATION_FILES = ["out_club.json", "out_liquor.json", "out_smoke.json"]
+# Map category of every location, by the extraction file it came from
+CATEGORIES = {"out_club.json": "club", "out_liquor.json": "liquor", "out_smoke.json": "smoke"}
 REVIEWS_FILE = "all_reviews-2.json"
+# Reviews per parsed batch and per bulk insert; the pipeline holds a few dozen at most
+REVIEW_BATCH = WRITE_CHUNK
+
+
+def source_ids(item: dict) -> dict:
+    """Google ids of an extraction record, for entity resolution."""
+    return {
+        "place_id": item.get("Place Id") or None,
+        "cid": item.get("Cid") or None,
+        "fid": item.get("Fid") or None,
+    }
+
+
+def record_key(name: str, ids: dict) -> str:
+    """Manifest key of an extraction record: its most stable id."""
+    return ids["place_id"] or ids["cid"] or name
+
+
+def new_source_key(name: str, lat, long, ids: dict) -> str:
+    """``source_key`` for a location the DB doesn't have yet."""
+    if ids["place_id"]:
+        return ids["place_id"]
+    if ids["cid"]:
+        return f"cid:{ids['cid']}"
+    if lat is None or long is None:
+        return normalize_name(name)
+    return f"{normalize_name(name)}@{lat:.5f},{long:.5f}"
+
+
+async def load_places(repo: Repository) -> tuple[PlaceIndex, dict[str, int]]:
+    """Index of every stored location by ``source_key``, and their ids."""
+    places = PlaceIndex()
+    location_ids: dict[str, int] = {}
+    for row in await with_retries(repo.list_location_keys):
+        places.add(row["source_key"], row["name"], row["lat"], row["long"], row["place_id"], row["cid"], row["fid"])
+        location_ids[row["source_key"]] = row["location_id"]
+    print(f"[*] Indexed {len(places)} existing locations")
+    return places, location_ids
+
 
 # =====================================================================
-# STEP 1 ─ Insert locations from out_club / out_liquor / out_smoke
+# STEP 1 ─ Upsert locations from out_club / out_liquor / out_smoke
 # =====================================================================
-# Maps location name -> location_id returned by DB
-locations_map: dict[str, int] = {}
-loc_inserted = 0
+async def insert_locations(repo: Repository, manifest: Manifest, places: PlaceIndex,
+                           location_ids: dict[str, int]) -> None:
+    stats = Throughput("Locations upserted")
+    rows: dict[str, dict] = {}
+    # Source file, manifest key and fingerprint of each row, for the manifest
+    origins: dict[str, tuple[str, str, bytes]] = {}
+    versions = {filepath: file_version(filepath) for filepath in LOCATION_FILES}
+    # Locations already claimed by an earlier file, which wins the category
+    claimed_keys: set[str] = set()
+    claimed_ids: set[int] = set()
+    unchanged = 0
 
-for filepath in LOCATION_FILES:
-    with open(filepath, "r", encoding="utf-8") as f:
-        raw = json.load(f)
+    for filepath in LOCATION_FILES:
+        _, complete = manifest.checkpoint(filepath, versions[filepath])
+        if complete:
+            claimed_ids.update(manifest.refs(filepath).values())
+            print(f"[=] Unchanged since last run: {filepath}")
+            continue
 
-    items = raw.get("data", [])
-    print(f"[*] Loaded {len(items)} locations from {filepath}")
+        with open(filepath, "r", encoding="utf-8") as f:
+            raw = json.load(f)
 
-    for item in items:
-        name = item.get("Name", "").strip()
-        if not name or name in locations_map:
-            continue  # skip empty names or duplicates across files
+        items = raw.get("data", [])
+        print(f"[*] Loaded {len(items)} locations from {filepath}")
 
-        loc_data = {
-            "name": name,
-            "lat": item.get("Latitude"),
-            "long": item.get("Longitude"),
-            "addr": item.get("Fulladdress"),
-        }
+        for item in items:
+            name = item.get("Name", "").strip()
+            if not name:
+                continue
+            lat, long = item.get("Latitude"), item.get("Longitude")
+            ids = source_ids(item)
+
+            key = places.resolve(name, lat, long, **ids)
+            if key is None:
+                key = new_source_key(name, lat, long, ids)
+                # Indexed now so that later records of the same place match it
+                places.add(key, name, lat, long, **ids)
+            if key in claimed_keys or location_ids.get(key) in claimed_ids:
+                continue  # same place seen in an earlier file
+            claimed_keys.add(key)
+
+            row = {
+                "source_key": key,
+                "name": name,
+                "lat": lat,
+                "long": long,
+                "addr": item.get("Fulladdress"),
+                "category": CATEGORIES.get(filepath),
+                **ids,
+            }
+            digest = fingerprint(row)
+            if not manifest.changed(filepath, record_key(name, ids), digest):
+                unchanged += 1
+                continue
+            rows[key] = row
+            origins[key] = (filepath, record_key(name, ids), digest)
 
+    if rows:
         try:
-            # Check if location already exists before inserting
-            existing = (
-                supabase.table("locations")
-                .select("location_id")
-                .eq("name", name)
-                .execute()
-            )
-            if existing.data:
-                loc_id = existing.data[0]["location_id"]
-                locations_map[name] = loc_id
-                print(f"  [=] Already exists: {name} (id={loc_id})")
-            else:
-                result = supabase.table("locations").insert(loc_data).execute()
-                loc_id = result.data[0]["location_id"]
-                locations_map[name] = loc_id
-                loc_inserted += 1
-                print(f"  [+] {name} (id={loc_id})")
+            # Locations matched to stored ones are updated in place and keep their ids
+            written = await with_retries(lambda: repo.upsert_locations(list(rows.values())), stats)
         except Exception as e:
-            print(f"  [!] Error inserting '{name}': {e}")
-            try:
-                existing = (
-                    supabase.table("locations")
-                    .select("location_id")
-                    .eq("name", name)
-                    .execute()
-                )
-                if existing.data:
-                    locations_map[name] = existing.data[0]["location_id"]
-                    print(f"      Using existing id={locations_map[name]}")
-            except Exception as e2:
-                print(f"      Could not fetch existing: {e2}")
-
-print(f"\n[+] Locations inserted: {loc_inserted}")
-print(f"[+] Total locations tracked: {len(locations_map)}\n")
+            print(f"  [!] Error upserting locations: {e}")
+            return
+        location_ids.update(written)
+        stats.add(len(written))
+
+        by_file: dict[str, list] = defaultdict(list)
+        for key, loc_id in written.items():
+            filepath, name, digest = origins[key]
+            by_file[filepath].append((name, digest, loc_id))
+        for filepath, records in by_file.items():
+            manifest.record(filepath, records)
+    for filepath, version in versions.items():
+        manifest.set_checkpoint(filepath, version, 0, complete=True)
+
+    print(f"[+] {stats}")
+    print(f"[=] Locations unchanged: {unchanged}")
+    print(f"[+] Total locations tracked: {len(location_ids)}\n")
+
 
 # =====================================================================
-# STEP 2 ─ Insert reviews from google_reviews.json  [COMMENTED OUT]
+# STEP 2 ─ Insert reviews from the scraped reviews dump
 # =====================================================================
-with open(REVIEWS_FILE, "r", encoding="utf-8") as f:
-    reviews_data = json.load(f)
-
-print(f"[*] Loaded {len(reviews_data)} reviews from {REVIEWS_FILE}")
-
-# Deduplicate within the file itself by review_id
-seen_ids: set[str] = set()
-deduped = []
-for rev in reviews_data:
-    rid = rev.get("review_id", "")
-    if rid and rid not in seen_ids:
-        seen_ids.add(rid)
-        deduped.append(rev)
-    elif not rid:
-        deduped.append(rev)  # no id — keep but can't dedup
-print(f"[*] After dedup: {len(deduped)} unique reviews (dropped {len(reviews_data) - len(deduped)} duplicates)")
-reviews_data = deduped
-
-rev_inserted = 0
-rev_skipped = 0
-
-for rev in reviews_data:
-    company = rev.get("company", "").strip()
-    loc_id = locations_map.get(company)
-
-    # If the review's company isn't in the locations we just inserted,
-    # try a DB lookup in case it already existed.
-    if loc_id is None:
+def review_key(review_id: str) -> int:
+    """64-bit fingerprint of a review_id; a set of these is a fraction of the size of the ids."""
+    return int.from_bytes(hashlib.blake2b(review_id.encode(), digest_size=8).digest(), "little")
+
+
+def parse_reviews(path: str, seen_ids: set[int], counts: Counter, skip: int = 0) -> Iterator[Batch]:
+    """Reviews in the dump at ``path`` after the first ``skip``, in batches, minus repeats of a review_id.
+
+    Batch positions count every review in the file, duplicates included.
+    """
+    batch = Batch(start=skip)
+    for pos, rev in enumerate(iter_json_array(path)):
+        if pos < skip:
+            continue
+        counts["read"] += 1
+        batch.end = pos + 1
+        rid = rev.get("review_id", "")
+        if rid:
+            key = review_key(rid)
+            if key in seen_ids:
+                counts["dropped"] += 1
+                continue
+            seen_ids.add(key)
+        # no id — keep but can't dedup
+        batch.append(rev)
+        if len(batch) >= REVIEW_BATCH:
+            yield batch
+            batch = Batch(start=batch.end)
+    if batch.end > batch.start:
+        yield batch
+
+
+async def insert_reviews(repo: Repository, manifest: Manifest, places: PlaceIndex,
+                         location_ids: dict[str, int]) -> None:
+    version = file_version(REVIEWS_FILE)
+    position, complete = manifest.checkpoint(REVIEWS_FILE, version)
+    if complete:
+        print(f"[=] Unchanged since last run: {REVIEWS_FILE}")
+        return
+    checkpoint = Checkpoint(manifest, REVIEWS_FILE, version, position)
+    if position:
+        print(f"[*] Resuming {REVIEWS_FILE} after review {position}")
+    print(f"[*] Streaming reviews from {REVIEWS_FILE}")
+
+    # Deduplicate within the file itself by review_id fingerprint
+    seen_ids: set[int] = set()
+    counts: Counter = Counter()
+    stats = PipelineStats()
+
+    async def resolve(batch: Batch) -> Batch:
+        # (row, manifest key, fingerprint) of each new or changed review
+        rows = Batch(start=batch.start, end=batch.end)
+        keys: set[str] = set()
+        for rev in batch:
+            company = rev.get("company", "").strip()
+            # Review dumps carry the place's fid (feature part only) as place_id
+            loc_id = location_ids.get(places.resolve(company, fid=rev.get("place_id")))
+
+            if loc_id is None:
+                print(f"  [!] No matching location for company '{company}' — skipping review")
+                counts["skipped"] += 1
+                continue
+
+            review_text_obj = rev.get("review_text", {})
+            review_text = review_text_obj.get("en", "") if isinstance(review_text_obj, dict) else ""
+
+            rating = rev.get("rating")
+            if rating is not None:
+                rating = int(rating)
+
+            row = {
+                "location_id": loc_id,
+                "review_content": review_text,
+                "rating": rating,
+                "source_review_id": rev.get("review_id") or None,
+            }
+            digest = fingerprint(row)
+            # Reviews without an id are known by their content alone, in the
+            # manifest and in the DB, so resending one never stores it twice
+            key = row["source_review_id"] or digest.hex()
+            row["source_review_id"] = key
+            if key in keys:
+                # An id-less review repeated in the batch; the upsert may not touch a row twice
+                counts["dropped"] += 1
+                continue
+            keys.add(key)
+            if not manifest.changed(REVIEWS_FILE, key, digest):
+                counts["unchanged"] += 1
+                continue
+            rows.append((row, key, digest))
+        if not rows:
+            checkpoint.finish(batch.start, batch.end)
+        return rows
+
+    async def write(batch: Batch) -> int:
+        rows = [row for row, _, _ in batch]
         try:
-            existing = (
-                supabase.table("locations")
-                .select("location_id")
-                .eq("name", company)
-                .execute()
-            )
-            if existing.data:
-                loc_id = existing.data[0]["location_id"]
-                locations_map[company] = loc_id
-        except Exception:
-            pass
-
-    if loc_id is None:
-        print(f"  [!] No matching location for company '{company}' — skipping review")
-        rev_skipped += 1
-        continue
-
-    review_text_obj = rev.get("review_text", {})
-    review_text = review_text_obj.get("en", "") if isinstance(review_text_obj, dict) else ""
-
-    rating = rev.get("rating")
-    if rating is not None:
-        rating = int(rating)
-
-    review_row = {
-        "location_id": loc_id,
-        "review_content": review_text,
-        "rating": rating,
-    }
+            # Safe to retry: reviews are upserted on source_review_id, and the
+            # triggers (sql/002, sql/006) count what the DB actually changes
+            written = await with_retries(lambda: repo.upsert_reviews(rows), stats.written)
+        except Exception as e:
+            # Left before the checkpoint, so the next run retries it
+            print(f"  [!] Error writing {len(rows)} reviews: {e}")
+            stats.written.failures += 1
+            return 0
+        counts["written"] += len(written)
+        # Only now is the batch settled; a crash before this resends it
+        manifest.record(REVIEWS_FILE, [(key, digest, None) for _, key, digest in batch])
+        checkpoint.finish(batch.start, batch.end)
+        return len(rows)
 
-    try:
-        supabase.table("reviews").insert(review_row).execute()
-        rev_inserted += 1
-    except Exception as e:
-        print(f"  [!] Error inserting review by '{rev.get('author', 'N/A')}': {e}")
-        rev_skipped += 1
+    await run_pipeline(parse_reviews(REVIEWS_FILE, seen_ids, counts, skip=position), resolve, write, stats)
+
+    print(f"[*] Read {counts['read']} reviews (dropped {counts['dropped']} duplicates)")
+    print(f"\n[+] Done!")
+    print(f"    Locations tracked : {len(location_ids)}")
+    print(f"    Reviews written   : {counts['written']} (new or changed)")
+    print(f"    Reviews existing  : {stats.written.rows - counts['written']}")
+    print(f"    Reviews unchanged : {counts['unchanged']}")
+    print(f"    Reviews skipped   : {counts['skipped']}")
+
+    if counts["skipped"]:
+        # Rescan the whole file next run, in case their locations show up
+        manifest.set_checkpoint(REVIEWS_FILE, version, 0)
+    elif not checkpoint.complete(position + counts["read"]):
+        print(f"  [!] Reviews after {checkpoint.position} are not all written; the next run resumes there")
+
+    for stage in stats:
+        print(f"[+] Reviews {stage}")
 
-print(f"\n[+] Done!")
-print(f"    Locations tracked : {len(locations_map)}")
-print(f"    Reviews inserted  : {rev_inserted}")
-print(f"    Reviews skipped   : {rev_skipped}")
 
 # =====================================================================
 # STEP 3 ─ Insert location images from all three location JSON files
 # =====================================================================
-print("\n[*] Inserting location images...")
-img_inserted = 0
-img_skipped = 0
-
-for filepath in LOCATION_FILES:
-    with open(filepath, "r", encoding="utf-8") as f:
-        raw = json.load(f)
-
-    items = raw.get("data", [])
-    for item in items:
-        name = item.get("Name", "").strip()
-        image_url = item.get("Featured Image", "").strip()
-        loc_id = locations_map.get(name)
-
-        if not name or not image_url:
-            img_skipped += 1
-            continue
+async def insert_images(repo: Repository, manifest: Manifest, places: PlaceIndex,
+                        location_ids: dict[str, int]) -> None:
+    print("\n[*] Inserting location images...")
+    stats = Throughput("Images written")
+    # Every location's current images; a location whose images changed gets
+    # all of them re-sent, since the DB drops the ones not sent
+    images: dict[int, list[dict]] = defaultdict(list)
+    changed: set[int] = set()
+    # (source, manifest key, fingerprint) of each changed row, for the manifest
+    origins = []
+    img_skipped = 0
+    unchanged = 0
 
-        if loc_id is None:
-            # Fallback DB lookup
-            try:
-                existing = (
-                    supabase.table("locations")
-                    .select("location_id")
-                    .eq("name", name)
-                    .execute()
-                )
-                if existing.data:
-                    loc_id = existing.data[0]["location_id"]
-                    locations_map[name] = loc_id
-            except Exception:
-                pass
-
-        if loc_id is None:
-            print(f"  [!] No location_id for '{name}' — skipping image")
-            img_skipped += 1
-            continue
+    # Files are read even when unchanged: their images must be re-sent along
+    # with a changed one of the same location
+    for filepath in LOCATION_FILES:
+        source = f"{filepath}#images"
+        with open(filepath, "r", encoding="utf-8") as f:
+            raw = json.load(f)
 
-        # Skip if image already exists for this location
-        try:
-            existing_img = (
-                supabase.table("location_images")
-                .select("id")
-                .eq("location_id", loc_id)
-                .execute()
-            )
-            if existing_img.data:
+        items = raw.get("data", [])
+        for item in items:
+            name = item.get("Name", "").strip()
+            image_url = item.get("Featured Image", "").strip()
+
+            if not name or not image_url:
+                img_skipped += 1
+                continue
+
+            ids = source_ids(item)
+            loc_id = location_ids.get(places.resolve(name, item.get("Latitude"), item.get("Longitude"), **ids))
+            if loc_id is None:
+                print(f"  [!] No location_id for '{name}' — skipping image")
                 img_skipped += 1
                 continue
-        except Exception:
-            pass
 
+            row = {"location_id": loc_id, "name": name, "image_url": image_url}
+            # One row per image: the upsert may not touch a row twice
+            if all(r["image_url"] != image_url for r in images[loc_id]):
+                images[loc_id].append(row)
+            digest = fingerprint(row)
+            if not manifest.changed(source, record_key(name, ids), digest):
+                unchanged += 1
+                continue
+            changed.add(loc_id)
+            origins.append((source, record_key(name, ids), digest))
+
+    rows = [row for loc_id in sorted(changed) for row in images[loc_id]]
+    written = []
+    if rows:
         try:
-            supabase.table("location_images").insert({
-                "location_id": loc_id,
-                "name": name,
-                "image_url": image_url,
-            }).execute()
-            img_inserted += 1
-            print(f"  [+] Image for: {name}")
+            # Replaces each location's images; ones already stored are kept
+            written = await with_retries(lambda: repo.replace_images(rows), stats)
         except Exception as e:
-            print(f"  [!] Error inserting image for '{name}': {e}")
-            img_skipped += 1
+            print(f"  [!] Error writing images: {e}")
+            return
+        stats.add(len(rows))
+
+        by_source: dict[str, list] = defaultdict(list)
+        for source, key, digest in origins:
+            by_source[source].append((key, digest, None))
+        for source, records in by_source.items():
+            manifest.record(source, records)
+
+    print(f"\n[+] Images written  : {len(written)}")
+    print(f"    Images unchanged: {unchanged}")
+    print(f"    Images skipped  : {img_skipped}")
+    print(f"[+] {stats}")
+
+
+async def main(full: bool = False):
+    repo = await create_repository()
+    # Records and checkpoints of earlier runs, so only new or changed records are written
+    manifest = Manifest()
+    if full:
+        manifest.clear()
+    try:
+        # Resolves records to locations by source_key; location_ids maps those to ids
+        places, location_ids = await load_places(repo)
+        await insert_locations(repo, manifest, places, location_ids)
+        await insert_reviews(repo, manifest, places, location_ids)
+        await insert_images(repo, manifest, places, location_ids)
+    finally:
+        await repo.aclose()
+        manifest.close()
+
 
-print(f"\n[+] Images inserted : {img_inserted}")
-print(f"    Images skipped  : {img_skipped}")
\ No newline at end of file
+if __name__ == "__main__":
+    # --full ignores the manifest and reloads every record
+    asyncio.run(main(full="--full" in sys.argv[1:]))
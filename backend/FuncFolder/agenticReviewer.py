@@ -1,11 +1,12 @@
 from openai import OpenAI
+import asyncio
 import json
-from supabase import create_client, Client
+import sys
+from pathlib import Path
 
-# ── Supabase ──
-url: str = "https://iofbbgeonizbqvvntely.supabase.co"
-key: str = "sb_publishable_d8ETrLfDZDFCqKT58AdOUQ_e3n5LHnU"
-supabase: Client = create_client(url, key)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from places import PlaceIndex
+from repository import Repository, create_repository
 
 # ── LLM ──
 client = OpenAI(
@@ -35,14 +36,9 @@ Respond ONLY in this exact JSON format (no extra text):
 }"""
 
 
-def fetch_locations_with_reviews():
-    """Pull all locations and their reviews from Supabase."""
-    result = (
-        supabase.table("locations")
-        .select("location_id, name, lat, long, addr, reviews(review_content, rating)")
-        .execute()
-    )
-    return result.data
+async def fetch_locations_with_reviews(repo: Repository):
+    """Pull all locations and their reviews from the database."""
+    return await repo.list_locations_with_reviews()
 
 
 def build_review_block(location: dict) -> str:
@@ -99,8 +95,12 @@ def analyze_business(name: str, review_block: str) -> dict:
         }
 
 
-def upsert_risk_reports(results: list[dict]):
-    """Insert or update risk reports in Supabase after agent analysis."""
+async def upsert_risk_reports(repo: Repository, results: list[dict], places: PlaceIndex):
+    """Insert or update risk reports in the database after agent analysis.
+
+    Entries are matched to locations by their ``location_id``, else by
+    resolving ``business_name`` in ``places``.
+    """
     inserted = 0
     skipped = 0
 
@@ -110,19 +110,7 @@ def upsert_risk_reports(results: list[dict]):
             skipped += 1
             continue
 
-        # Resolve location_id from DB
-        loc_id = None
-        try:
-            res = (
-                supabase.table("locations")
-                .select("location_id")
-                .eq("name", biz_name)
-                .execute()
-            )
-            if res.data:
-                loc_id = res.data[0]["location_id"]
-        except Exception:
-            pass
+        loc_id = entry.get("location_id") or places.resolve(biz_name)
 
         risk_score = entry.get("risk_score")
         if isinstance(risk_score, str):
@@ -137,19 +125,10 @@ def upsert_risk_reports(results: list[dict]):
         }
 
         try:
-            # Check if a report already exists and update it, otherwise insert
-            existing = (
-                supabase.table("risk_reports")
-                .select("id")
-                .eq("business_name", biz_name)
-                .execute()
-            )
-            if existing.data:
-                report_id = existing.data[0]["id"]
-                supabase.table("risk_reports").update(risk_row).eq("id", report_id).execute()
+            # Update the existing report for this business, otherwise insert
+            if await repo.upsert_risk_report(risk_row):
                 print(f"  [~] Updated: {biz_name} (risk={risk_score})")
             else:
-                supabase.table("risk_reports").insert(risk_row).execute()
                 print(f"  [+] Inserted: {biz_name} (risk={risk_score})")
             inserted += 1
         except Exception as e:
@@ -160,9 +139,20 @@ def upsert_risk_reports(results: list[dict]):
     print(f"    Risk reports skipped  : {skipped}")
 
 
-def main():
-    locations = fetch_locations_with_reviews()
+async def main():
+    repo = await create_repository()
+    try:
+        await analyze_and_store(repo)
+    finally:
+        await repo.aclose()
+
+
+async def analyze_and_store(repo: Repository):
+    locations = await fetch_locations_with_reviews(repo)
     print(f"[*] Found {len(locations)} locations in the database.\n")
+    places = PlaceIndex()
+    for loc in locations:
+        places.add(loc["location_id"], loc["name"], loc.get("lat"), loc.get("long"))
     print("=" * 70)
 
     results = []
@@ -173,6 +163,8 @@ def main():
 
         print(f"\n>> Analyzing: {name}")
         analysis = analyze_business(name, review_block)
+        # The model may respell the name; keep which location it was about
+        analysis["location_id"] = loc["location_id"]
         results.append(analysis)
 
         score = analysis.get("risk_score", "?")
@@ -189,10 +181,10 @@ def main():
         json.dump(results, f, indent=2, ensure_ascii=False)
     print(f"\n[+] Full report saved to risk_report.json")
 
-    # Push results directly into Supabase
-    print("\n[*] Upserting risk reports into Supabase...")
-    upsert_risk_reports(results)
+    # Push results directly into the database
+    print("\n[*] Upserting risk reports into the database...")
+    await upsert_risk_reports(repo, results, places)
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
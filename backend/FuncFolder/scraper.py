@@ -7,7 +7,9 @@ scrapes its reviews, filters by keywords, and saves matched reviews to CSV.
 import csv
 import json
 import re
+import sys
 import time
+from pathlib import Path
 from urllib.parse import quote_plus
 
 from selenium import webdriver
@@ -21,19 +23,15 @@ from selenium.common.exceptions import (
 )
 from webdriver_manager.chrome import ChromeDriverManager
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from keywords import KEYWORDS
+
 # ──────────────────────────────────────────────
 # CONFIGURATION — edit these to customise the scrape
 # ──────────────────────────────────────────────
 
-# Keywords to look for in reviews (case-insensitive).
-# A review is saved if it contains ANY of these words.
-KEYWORDS = [
-    "hookah", "shisha", "cigar", "pipe", "tobacco",
-    "vape", "e-liquid", "disposable", "rolling papers",
-    "glass", "bong", "grinder", "kratom", "CBD",
-    "friendly", "selection", "price", "cheap", "expensive",
-    "discount", "quality", "service", "recommend",
-]
+# Keywords to look for in reviews live in backend/keywords.py (KEYWORDS),
+# shared with the location keyword facets built at ingest.
 
 # How many review pages to scrape per business (10 reviews per page)
 MAX_REVIEW_PAGES = 5
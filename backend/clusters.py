@@ -0,0 +1,204 @@
+"""Hierarchical marker clusters for zoomed-out map views.
+
+Same approach as Mapbox's supercluster: locations are projected to Web
+Mercator and, starting from the individual points, greedily merged level by
+level with a search radius that doubles at each zoom step down.  Every level
+is kept as flat NumPy arrays, so serving a viewport is one mask over the
+level for the requested zoom.  Lone locations are JSON-encoded once per
+rebuild, so a response only encodes the clusters themselves.
+"""
+
+import math
+from typing import Optional
+
+import numpy as np
+import orjson
+
+from location_index import join_fragments
+
+MIN_ZOOM = 0
+# Above this zoom individual locations are returned instead of clusters.
+MAX_ZOOM = 16
+# Cluster radius in pixels, relative to a tile EXTENT pixels wide.
+RADIUS = 60
+EXTENT = 512
+
+
+def _project_x(lng: float) -> float:
+    return lng / 360 + 0.5
+
+
+def _project_y(lat: float) -> float:
+    # Clamped like tiles._tile_coords; the poles themselves project to infinity.
+    sin = min(max(math.sin(math.radians(lat)), -0.9999), 0.9999)
+    y = 0.5 - 0.25 * math.log((1 + sin) / (1 - sin)) / math.pi
+    return min(max(y, 0.0), 1.0)
+
+
+def _unproject_lat(y: float) -> float:
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+
+
+class _Level:
+    """All clusters and unclustered points at one zoom level."""
+
+    __slots__ = ("x", "y", "count", "rating_sum", "rating_n", "point")
+
+    def __init__(self, x, y, count, rating_sum, rating_n, point):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.count = np.asarray(count, dtype=np.int64)
+        self.rating_sum = np.asarray(rating_sum, dtype=np.float64)
+        self.rating_n = np.asarray(rating_n, dtype=np.int64)
+        # Record index for a lone location, -1 for a real cluster.
+        self.point = np.asarray(point, dtype=np.int64)
+
+
+def _cluster(prev: _Level, zoom: int) -> _Level:
+    r = RADIUS / (EXTENT * 2 ** zoom)
+    r2 = r * r
+
+    grid: dict[tuple[int, int], list[int]] = {}
+    xs, ys = prev.x.tolist(), prev.y.tolist()
+    for i, (x, y) in enumerate(zip(xs, ys)):
+        grid.setdefault((int(x / r), int(y / r)), []).append(i)
+
+    visited = [False] * len(xs)
+    out_x, out_y, out_count, out_sum, out_n, out_point = [], [], [], [], [], []
+    counts = prev.count.tolist()
+    sums = prev.rating_sum.tolist()
+    ns = prev.rating_n.tolist()
+    points = prev.point.tolist()
+
+    for i in range(len(xs)):
+        if visited[i]:
+            continue
+        visited[i] = True
+        x, y = xs[i], ys[i]
+        cx, cy = int(x / r), int(y / r)
+
+        members = [i]
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                for j in grid.get((gx, gy), ()):
+                    if not visited[j] and (xs[j] - x) ** 2 + (ys[j] - y) ** 2 <= r2:
+                        visited[j] = True
+                        members.append(j)
+
+        if len(members) == 1:
+            out_x.append(x)
+            out_y.append(y)
+            out_count.append(counts[i])
+            out_sum.append(sums[i])
+            out_n.append(ns[i])
+            out_point.append(points[i])
+            continue
+
+        total = sum(counts[j] for j in members)
+        out_x.append(sum(xs[j] * counts[j] for j in members) / total)
+        out_y.append(sum(ys[j] * counts[j] for j in members) / total)
+        out_count.append(total)
+        out_sum.append(sum(sums[j] for j in members))
+        out_n.append(sum(ns[j] for j in members))
+        out_point.append(-1)
+
+    return _Level(out_x, out_y, out_count, out_sum, out_n, out_point)
+
+
+class _Snapshot:
+    """Cluster levels with the records and fragments their points index into."""
+
+    __slots__ = ("records", "fragments", "levels")
+
+    def __init__(self, records: list[dict], fragments: list[bytes], levels: list[_Level]):
+        self.records = records
+        self.fragments = fragments
+        self.levels = levels
+
+
+class ClusterIndex:
+    """Per-zoom cluster levels over the location records, rebuilt on refresh."""
+
+    def __init__(self):
+        self._snapshot: Optional[_Snapshot] = None
+
+    def rebuild(self, records: list[dict]) -> None:
+        """Recompute every zoom level; swapped in atomically for readers."""
+        ratings = [r.get("rating") for r in records]
+        reviews = [r.get("reviewCount") or 0 for r in records]
+        level = _Level(
+            [_project_x(r["lng"]) for r in records],
+            [_project_y(r["lat"]) for r in records],
+            [1] * len(records),
+            # Cluster rating is the review-weighted mean of its locations' ratings.
+            [rt * n if rt is not None else 0.0 for rt, n in zip(ratings, reviews)],
+            [n if rt is not None else 0 for rt, n in zip(ratings, reviews)],
+            range(len(records)),
+        )
+
+        levels = [level] * (MAX_ZOOM + 2)
+        for zoom in range(MAX_ZOOM, MIN_ZOOM - 1, -1):
+            level = _cluster(level, zoom)
+            levels[zoom] = level
+
+        fragments = [orjson.dumps({"type": "location", **r}) for r in records]
+        # One assignment, so readers never pair levels with another rebuild's records.
+        self._snapshot = _Snapshot(records, fragments, levels)
+
+    @property
+    def ready(self) -> bool:
+        return self._snapshot is not None
+
+    def _visible(
+        self, levels: list[_Level], min_lat: float, min_lng: float, max_lat: float, max_lng: float, zoom: int
+    ) -> tuple[_Level, list[int]]:
+        level = levels[min(max(zoom, MIN_ZOOM), MAX_ZOOM + 1)]
+        x0, x1 = _project_x(min_lng), _project_x(max_lng)
+        y0, y1 = _project_y(max_lat), _project_y(min_lat)
+        inside = (level.x >= x0) & (level.x <= x1) & (level.y >= y0) & (level.y <= y1)
+        return level, np.flatnonzero(inside).tolist()
+
+    @staticmethod
+    def _cluster_dict(level: _Level, i: int) -> dict:
+        n = int(level.rating_n[i])
+        return {
+            "type": "cluster",
+            "lat": _unproject_lat(float(level.y[i])),
+            "lng": (float(level.x[i]) - 0.5) * 360,
+            "count": int(level.count[i]),
+            "rating": round(float(level.rating_sum[i]) / n, 1) if n else None,
+        }
+
+    def get_clusters(
+        self, min_lat: float, min_lng: float, max_lat: float, max_lng: float, zoom: int
+    ) -> list[dict]:
+        """Clusters and lone locations inside the box at ``zoom``.
+
+        Clusters are ``{"type": "cluster", "lat", "lng", "count", "rating"}``;
+        lone locations are the location record with ``"type": "location"``.
+        """
+        snap = self._snapshot
+        if snap is None:
+            return []
+
+        level, visible = self._visible(snap.levels, min_lat, min_lng, max_lat, max_lng, zoom)
+        result = []
+        for i in visible:
+            point = int(level.point[i])
+            result.append({"type": "location", **snap.records[point]} if point >= 0 else self._cluster_dict(level, i))
+        return result
+
+    def get_clusters_json(
+        self, min_lat: float, min_lng: float, max_lat: float, max_lng: float, zoom: int
+    ) -> bytes:
+        """``get_clusters`` as an encoded JSON array, reusing the lone locations' fragments."""
+        snap = self._snapshot
+        if snap is None:
+            return b"[]"
+
+        level, visible = self._visible(snap.levels, min_lat, min_lng, max_lat, max_lng, zoom)
+        parts = []
+        for i in visible:
+            point = int(level.point[i])
+            parts.append(snap.fragments[point] if point >= 0 else orjson.dumps(self._cluster_dict(level, i)))
+        return join_fragments(parts)
@@ -0,0 +1,175 @@
+"""Negotiated brotli/gzip response compression.
+
+``CompressionMiddleware`` compresses any JSON, NDJSON or vector tile response
+the client accepts an encoding for, unless it is below ``MINIMUM_SIZE`` or
+already encoded.  Streamed responses are compressed chunk by chunk with a
+flush after each one, so NDJSON consumers still see every row as it is sent.
+Cached responses compress themselves once per variant (see
+``response_cache``) and pass through untouched.
+
+Brotli is used when the ``brotli`` package is installed; otherwise only gzip
+is offered.
+"""
+
+import gzip
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional: gzip alone still covers every browser
+    brotli = None
+
+# Bodies smaller than this gain less than the header overhead.
+MINIMUM_SIZE = 1024
+GZIP_LEVEL = 6
+# Brotli's top qualities are far too slow per request; 5 is about gzip -9's size at gzip -6's speed.
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/vnd.mapbox-vector-tile",
+    "text/",
+)
+
+SUPPORTED = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the encoding to use for an Accept-Encoding header, preferring brotli."""
+    if not accept_encoding:
+        return None
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def variant_etag(etag: str, encoding: str) -> str:
+    """Strong ETag of an encoded variant, distinct from the identity one."""
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class _StreamCompressor:
+    """Incremental compressor that flushes after every chunk."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._gz = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._br.process(data) + self._br.flush()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._br.finish()
+        return self._gz.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """ASGI middleware applying ``negotiate``/``compress`` to outgoing responses."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        # None until the first body message decides; then "identity", "whole" or "stream".
+        mode: Optional[str] = None
+        stream: Optional[_StreamCompressor] = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, mode, stream
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                status = message["status"]
+                if ("content-encoding" in headers or status < 200 or status in (204, 304)
+                        or not is_compressible(headers.get("content-type"))):
+                    mode = "identity"
+                    await send(message)
+                else:
+                    start = message  # held until we know the body size
+                return
+
+            if message["type"] != "http.response.body" or mode == "identity":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+
+            if mode is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if not more and len(body) < self.minimum_size:
+                    mode = "identity"
+                    await send(start)
+                    await send(message)
+                    return
+
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "etag" in headers:
+                    headers["ETag"] = variant_etag(headers["etag"], encoding)
+                if more:
+                    mode = "stream"
+                    stream = _StreamCompressor(encoding)
+                    del headers["Content-Length"]
+                    await send(start)
+                else:
+                    mode = "whole"
+                    body = compress(body, encoding)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+
+            data = stream.chunk(body) if body else b""
+            if not more:
+                data += stream.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,272 @@
+"""Geocoding helpers shared by the API workers.
+
+Results are cached in a small SQLite database so every worker on the host sees
+the same entries, repeat searches skip Nominatim entirely, and we stay well
+inside its one-request-per-second usage policy.  The same database holds the
+request schedule that rate-limits all workers together.
+"""
+
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import httpx
+
+Coords = tuple[float, float]
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+USER_AGENT = "SinMaps/1.0"  # REQUIRED by Nominatim
+
+GEOCODE_CACHE_PATH = os.environ.get(
+    "GEOCODE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "geocode.sqlite3"),
+)
+GEOCODE_CACHE_TTL = int(os.environ.get("GEOCODE_CACHE_TTL", 30 * 24 * 3600))
+GEOCODE_CACHE_NEGATIVE_TTL = int(os.environ.get("GEOCODE_CACHE_NEGATIVE_TTL", 24 * 3600))
+GEOCODE_CACHE_MAX_ENTRIES = int(os.environ.get("GEOCODE_CACHE_MAX_ENTRIES", 100_000))
+
+# Nominatim allows one request per second across everything we run.
+GEOCODE_MIN_INTERVAL = float(os.environ.get("GEOCODE_MIN_INTERVAL", 1.0))
+# Callers that would have to queue longer than this are turned away instead.
+GEOCODE_MAX_WAIT = float(os.environ.get("GEOCODE_MAX_WAIT", 5.0))
+GEOCODE_TIMEOUT = 10
+
+# "apt 4b", "suite 200", "#12" ... the unit never changes the map position.
+_UNIT_RE = re.compile(
+    r"(?:\b(?:apt|apartment|unit|suite|ste|room|rm|bldg|floor)\b\.?|#)\s*(?:[\w-]*\d[\w-]*|[a-z])\b"
+)
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_address(address: str) -> str:
+    """Canonical cache key for a free-text address.
+
+    Case, punctuation, repeated whitespace and unit/suite designators are
+    dropped, so "123 Main St., Apt 4" and "123  main st" share one entry.
+    """
+    key = address.casefold()
+    key = _UNIT_RE.sub(" ", key)
+    key = _PUNCT_RE.sub(" ", key)
+    return _SPACE_RE.sub(" ", key).strip()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=5)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class GeocodeBusy(Exception):
+    """The upstream rate limit would keep this lookup queued for too long."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"geocoder busy, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class GeocodeCache:
+    """SQLite-backed geocode cache with TTL, negative entries and LRU eviction.
+
+    ``get`` returns ``(hit, coords)``; a hit with ``coords is None`` is a cached
+    "not found" answer.  The database runs in WAL mode so several worker
+    processes can read and write it concurrently.
+    """
+
+    def __init__(
+        self,
+        path: str = GEOCODE_CACHE_PATH,
+        ttl: float = GEOCODE_CACHE_TTL,
+        negative_ttl: float = GEOCODE_CACHE_NEGATIVE_TTL,
+        max_entries: int = GEOCODE_CACHE_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode_cache ("
+                " key TEXT PRIMARY KEY, lat REAL, lng REAL,"
+                " created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS geocode_cache_last_used ON geocode_cache (last_used)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections may not be shared across threads; keep one per thread.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+        return conn
+
+    def get(self, key: str) -> tuple[bool, Optional[Coords]]:
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT lat, lng, created_at FROM geocode_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return False, None
+
+        lat, lng, created_at = row
+        found = lat is not None and lng is not None
+        if now - created_at > (self.ttl if found else self.negative_ttl):
+            with conn:
+                conn.execute("DELETE FROM geocode_cache WHERE key = ?", (key,))
+            return False, None
+
+        with conn:
+            conn.execute("UPDATE geocode_cache SET last_used = ? WHERE key = ?", (now, key))
+        return True, (lat, lng) if found else None
+
+    def set(self, key: str, coords: Optional[Coords]) -> None:
+        now = time.time()
+        lat, lng = coords if coords is not None else (None, None)
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO geocode_cache (key, lat, lng, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, lat, lng, now, now),
+            )
+            conn.execute(
+                "DELETE FROM geocode_cache WHERE key IN ("
+                " SELECT key FROM geocode_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+
+class RateLimiter:
+    """Cross-process request scheduler: one upstream call per ``interval`` seconds.
+
+    Every worker reserves the next free slot in a shared SQLite row, so the
+    limit holds for the whole host rather than per process.  ``reserve``
+    returns how long the caller must wait for its slot, or raises
+    ``GeocodeBusy`` when that wait would exceed ``max_wait``.
+    """
+
+    def __init__(
+        self,
+        path: str = GEOCODE_CACHE_PATH,
+        interval: float = GEOCODE_MIN_INTERVAL,
+        max_wait: float = GEOCODE_MAX_WAIT,
+        name: str = "nominatim",
+    ):
+        self.path = path
+        self.interval = interval
+        self.max_wait = max_wait
+        self.name = name
+        self._local = threading.local()
+
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS rate_limit (name TEXT PRIMARY KEY, next_at REAL NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+            conn.isolation_level = None  # explicit BEGIN IMMEDIATE below
+        return conn
+
+    def reserve(self) -> float:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT next_at FROM rate_limit WHERE name = ?", (self.name,)).fetchone()
+            slot = max(now, row[0] if row else now)
+            if slot - now > self.max_wait:
+                conn.execute("ROLLBACK")
+                raise GeocodeBusy(slot - now)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limit (name, next_at) VALUES (?, ?)",
+                (self.name, slot + self.interval),
+            )
+            conn.execute("COMMIT")
+        except GeocodeBusy:
+            raise
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return slot - now
+
+
+class Geocoder:
+    """Async Nominatim client with caching, single-flight and global rate limiting.
+
+    Concurrent lookups of the same normalized address share one upstream call,
+    and all calls go through one pooled keep-alive connection.  Blocking
+    SQLite work runs in a thread so the event loop never waits on it.
+    """
+
+    def __init__(self, cache: GeocodeCache, limiter: RateLimiter, url: str = NOMINATIM_URL):
+        self.cache = cache
+        self.limiter = limiter
+        self.url = url
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    async def start(self) -> None:
+        self._client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            timeout=GEOCODE_TIMEOUT,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+        )
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def geocode(self, address: str) -> Optional[Coords]:
+        """Return ``(lat, lng)`` for the address, or ``None`` if Nominatim has no match.
+
+        Raises ``GeocodeBusy`` when the request would queue past the rate
+        limit's ``max_wait`` and ``httpx.HTTPError`` on upstream failures.
+        """
+        key = normalize_address(address)
+        hit, coords = await asyncio.to_thread(self.cache.get, key)
+        if hit:
+            return coords
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._lookup(key, address))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._lookup_done(key, t))
+        # Shielded so one disconnecting caller does not cancel the shared lookup.
+        return await asyncio.shield(task)
+
+    def _lookup_done(self, key: str, task: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter went away
+
+    async def _lookup(self, key: str, address: str) -> Optional[Coords]:
+        delay = await asyncio.to_thread(self.limiter.reserve)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        res = await self._client.get(
+            self.url,
+            params={
+                "q": address,
+                "format": "json",
+                "limit": 1,
+                "countrycodes": "us",
+            },
+        )
+        res.raise_for_status()
+        data = res.json()
+        coords = (float(data[0]["lat"]), float(data[0]["lon"])) if data else None
+        await asyncio.to_thread(self.cache.set, key, coords)
+        return coords
@@ -0,0 +1,185 @@
+"""Pipelined, retrying bulk ingestion for the offline writers.
+
+``run_pipeline`` joins three kinds of stage with bounded queues:
+
+- a parser that iterates a source of batches (``json_stream`` for review dumps),
+- a resolver that turns each parsed batch into rows ready to write,
+- ``WRITERS`` concurrent writers that send row batches to the repository.
+
+The queues hold at most ``QUEUE_SIZE`` batches, so a fast parser waits for
+the database instead of buffering the file, while several writes are in
+flight at once.  Writers wrap their calls in ``with_retries``, which retries
+transient failures (timeouts, dropped connections, overload and
+serialization errors) with exponential backoff and full jitter.  Every stage
+counts its rows in a ``Throughput``.
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Iterable, Optional, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+# Concurrent writer stages.
+WRITERS = 4
+# Batches buffered between two stages.
+QUEUE_SIZE = 8
+
+# Attempts per write, including the first.
+RETRY_ATTEMPTS = 5
+# Backoff ceiling for the first retry, doubling on each after it (seconds).
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30.0
+
+_TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+# Serialization failure, deadlock, too many connections, server shutting down
+# or starting up; class 08 (connection exceptions) is matched by prefix.
+# PGRST003 is PostgREST timing out waiting for a pooled connection.
+_TRANSIENT_CODES = {"40001", "40P01", "53300", "57P01", "57P02", "57P03", "PGRST003"}
+
+
+class Batch(list):
+    """Items of one batch, with the ``[start, end)`` positions of the source records it covers."""
+
+    def __init__(self, items: Iterable = (), start: int = 0, end: int = 0):
+        super().__init__(items)
+        self.start = start
+        self.end = end
+
+
+class Throughput:
+    """Rows and batches through one stage, with retries, failures and the rate since start."""
+
+    __slots__ = ("name", "rows", "batches", "retries", "failures", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows = 0
+        self.batches = 0
+        self.retries = 0
+        self.failures = 0
+        self.started = time.perf_counter()
+
+    def add(self, rows: int) -> None:
+        self.rows += rows
+        self.batches += 1
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self) -> float:
+        elapsed = self.elapsed
+        return self.rows / elapsed if elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.name}: {self.rows} rows in {self.batches} batches, {self.elapsed:.2f}s"
+                f" ({self.rate:.0f} rows/s), {self.retries} retries, {self.failures} failed")
+
+
+class PipelineStats:
+    """Counters of each stage of a ``run_pipeline`` call."""
+
+    __slots__ = ("parsed", "resolved", "written")
+
+    def __init__(self):
+        self.parsed = Throughput("parsed")
+        self.resolved = Throughput("resolved")
+        self.written = Throughput("written")
+
+    def __iter__(self):
+        return iter((self.parsed, self.resolved, self.written))
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Whether a failed write may succeed if simply tried again."""
+    if isinstance(exc, (httpx.TransportError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in _TRANSIENT_STATUS
+    # SQLAlchemy marks errors that broke the pooled connection.
+    if getattr(exc, "connection_invalidated", False):
+        return True
+    # postgrest's APIError carries the SQLSTATE or PGRST code; SQLAlchemy wraps
+    # the driver error, which carries it as ``sqlstate``.
+    for code in (getattr(exc, "code", None), getattr(getattr(exc, "orig", None), "sqlstate", None)):
+        if isinstance(code, str) and (code in _TRANSIENT_CODES or code.startswith("08")):
+            return True
+    return False
+
+
+async def with_retries(
+    call: Callable[[], Awaitable[T]], stats: Optional[Throughput] = None,
+    attempts: int = RETRY_ATTEMPTS, base_delay: float = RETRY_BASE_DELAY, max_delay: float = RETRY_MAX_DELAY,
+) -> T:
+    """Await ``call()``, retrying transient failures with exponential backoff and full jitter.
+
+    Permanent failures, and the last transient one, are raised; ``stats``
+    counts the retries.
+    """
+    for attempt in range(attempts):
+        try:
+            return await call()
+        except Exception as e:
+            if attempt == attempts - 1 or not is_transient(e):
+                raise
+            if stats is not None:
+                stats.retries += 1
+            await asyncio.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+    raise AssertionError("unreachable")
+
+
+async def run_pipeline(
+    source: Iterable[list],
+    resolve: Callable[[list], Awaitable[list]],
+    write: Callable[[list], Awaitable[int]],
+    stats: Optional[PipelineStats] = None,
+    writers: int = WRITERS,
+    queue_size: int = QUEUE_SIZE,
+) -> PipelineStats:
+    """Parse, resolve and write batches concurrently until ``source`` runs out.
+
+    ``resolve`` maps a parsed batch to the rows to write (empty batches are
+    dropped) and runs in a single task, so it may keep unlocked state.
+    ``write`` returns how many rows it wrote; its failures are its own to
+    handle.  An exception from any stage cancels the others and is raised.
+    """
+    stats = stats or PipelineStats()
+    parsed: asyncio.Queue = asyncio.Queue(queue_size)
+    resolved: asyncio.Queue = asyncio.Queue(queue_size)
+
+    async def parser() -> None:
+        for batch in source:
+            stats.parsed.add(len(batch))
+            await parsed.put(batch)
+        await parsed.put(None)
+
+    async def resolver() -> None:
+        while (batch := await parsed.get()) is not None:
+            rows = await resolve(batch)
+            if rows:
+                stats.resolved.add(len(rows))
+                await resolved.put(rows)
+        for _ in range(writers):
+            await resolved.put(None)
+
+    async def writer() -> None:
+        while (rows := await resolved.get()) is not None:
+            stats.written.add(await write(rows))
+
+    tasks: list[asyncio.Task[Any]] = [
+        asyncio.create_task(parser()), asyncio.create_task(resolver()),
+        *(asyncio.create_task(writer()) for _ in range(writers)),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return stats
@@ -0,0 +1,138 @@
+"""What ``Json2DB.py`` has loaded already, so re-runs only write the delta.
+
+The manifest keeps, per source file, a content fingerprint of every record
+that was written (plus the ``location_id`` it got, for locations), and a
+checkpoint: how many of the file's records are settled, for which version of
+the file (size and mtime).  A re-run skips a file that is unchanged and was
+finished, resumes an unfinished one after its checkpoint, and writes only
+records whose fingerprint is new or changed.
+
+It lives in a SQLite file under ``.cache`` like the data version counters.
+It describes one target database: delete it, or run ``Json2DB.py --full``,
+after pointing the ingest at another database or restoring this one.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Any, Iterable, Optional
+
+INGEST_MANIFEST_PATH = os.environ.get(
+    "INGEST_MANIFEST_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "ingest_manifest.sqlite3"),
+)
+
+
+def fingerprint(record: Any) -> bytes:
+    """128-bit hash of a JSON-serializable record, independent of key order."""
+    data = json.dumps(record, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(data.encode(), digest_size=16).digest()
+
+
+def file_version(path: str) -> str:
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+class Manifest:
+    """Record fingerprints and file checkpoints of past ingest runs."""
+
+    def __init__(self, path: str = INGEST_MANIFEST_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS records (source TEXT NOT NULL, key TEXT NOT NULL,"
+            " hash BLOB NOT NULL, ref INTEGER, PRIMARY KEY (source, key)) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints (source TEXT PRIMARY KEY, version TEXT NOT NULL,"
+            " position INTEGER NOT NULL, complete INTEGER NOT NULL)"
+        )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def clear(self) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM records")
+            self._conn.execute("DELETE FROM checkpoints")
+
+    # ── Records ──
+
+    def changed(self, source: str, key: str, digest: bytes) -> bool:
+        """Whether the record is new to the manifest or its content differs."""
+        row = self._conn.execute(
+            "SELECT hash FROM records WHERE source = ? AND key = ?", (source, key)
+        ).fetchone()
+        return row is None or row[0] != digest
+
+    def refs(self, source: str) -> dict[str, int]:
+        """``{key: ref}`` of the source's records that have one."""
+        return dict(self._conn.execute(
+            "SELECT key, ref FROM records WHERE source = ? AND ref IS NOT NULL", (source,)
+        ))
+
+    def record(self, source: str, records: Iterable[tuple[str, bytes, Optional[int]]]) -> None:
+        """Store ``(key, digest, ref)`` of records that are now written."""
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO records (source, key, hash, ref) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (source, key) DO UPDATE SET hash = excluded.hash, ref = excluded.ref",
+                [(source, key, digest, ref) for key, digest, ref in records],
+            )
+
+    # ── Checkpoints ──
+
+    def checkpoint(self, source: str, version: str) -> tuple[int, bool]:
+        """``(position, complete)`` for this version of the file; ``(0, False)`` if it is new or changed."""
+        row = self._conn.execute(
+            "SELECT position, complete FROM checkpoints WHERE source = ? AND version = ?", (source, version)
+        ).fetchone()
+        return (row[0], bool(row[1])) if row else (0, False)
+
+    def set_checkpoint(self, source: str, version: str, position: int, complete: bool = False) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO checkpoints (source, version, position, complete) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (source) DO UPDATE SET version = excluded.version,"
+                " position = excluded.position, complete = excluded.complete",
+                (source, version, position, int(complete)),
+            )
+
+
+class Checkpoint:
+    """Settled position in one source file, advanced as out-of-order batches finish.
+
+    Batches cover ``[start, end)`` record positions; the stored position only
+    moves past a batch once every batch before it has finished too, so a
+    resumed run never skips an unwritten record.
+    """
+
+    def __init__(self, manifest: Manifest, source: str, version: str, position: int = 0):
+        self.manifest = manifest
+        self.source = source
+        self.version = version
+        self.position = position
+        self._finished: dict[int, int] = {}
+
+    def finish(self, start: int, end: int) -> None:
+        self._finished[start] = end
+        moved = False
+        while self.position in self._finished:
+            self.position = self._finished.pop(self.position)
+            moved = True
+        if moved:
+            self.manifest.set_checkpoint(self.source, self.version, self.position)
+
+    def complete(self, end: int) -> bool:
+        """Mark the file settled if every record before ``end`` (its length) is; True if it was.
+
+        A batch that failed never finishes, so the position stays before it
+        and the next run resumes there.
+        """
+        if self.position < end:
+            return False
+        self.manifest.set_checkpoint(self.source, self.version, self.position, complete=True)
+        return True
@@ -0,0 +1,52 @@
+"""Data versions the API workers' caches are built from.
+
+The database keeps them in ``public.data_version`` and moves them itself,
+from statement-level triggers (``sql/007_data_version.sql``), so every
+writer retires the caches: ``Json2DB.py`` and ``agenticReviewer.py`` on any
+host as well as edits made directly in Supabase.  The global version moves
+on every write; each changed location's version is set to the global
+version of the write that changed it.
+
+Request handlers read them from ``DataVersions``, an in-memory copy the
+location index's loader thread refreshes, so they never wait on the database.
+"""
+
+from typing import Callable, Optional
+
+GLOBAL_SCOPE = "global"
+
+
+def _scope(location_id: int) -> str:
+    return f"location:{location_id}"
+
+
+class DataVersions:
+    """In-memory copy of the data versions.
+
+    ``source(after)`` returns the ``scope, version`` rows newer than
+    ``after`` (``Repository.list_data_versions``).  ``refresh`` fetches what
+    moved since the last call and returns the global version; ``get`` only
+    looks at the copy, so it is safe on the event loop.
+    """
+
+    def __init__(self, source: Callable[[int], list[dict]]):
+        self._source = source
+        self._global = -1
+        self._locations: dict[str, int] = {}
+
+    def refresh(self) -> int:
+        rows = self._source(self._global)
+        latest = self._global
+        for row in rows:
+            if row["scope"] == GLOBAL_SCOPE:
+                latest = row["version"]
+            else:
+                self._locations[row["scope"]] = row["version"]
+        self._global = latest
+        return latest
+
+    def get(self, location_id: Optional[int] = None) -> int:
+        """Version of one location, or of the whole data set when no id is given."""
+        if location_id is None:
+            return self._global
+        return self._locations.get(_scope(location_id), 0)
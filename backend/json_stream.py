@@ -0,0 +1,79 @@
+"""Incremental reading of large JSON array files.
+
+Review dumps are a single top-level JSON array that can run to gigabytes.
+``iter_json_array`` yields its elements one at a time while reading the file
+in fixed-size chunks, so memory holds one chunk plus the element being
+decoded rather than the whole parsed array.
+"""
+
+import json
+from typing import Any, Iterator
+
+# Characters read from the file per refill.
+READ_CHUNK = 1 << 16
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789eE.+-"
+
+
+def iter_json_array(path: str, chunk_size: int = READ_CHUNK) -> Iterator[Any]:
+    """Yield each element of the JSON array in the file at ``path``, in order."""
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip(chars: str) -> None:
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in chars:
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    return
+
+        skip(_WHITESPACE)
+        if buf[pos:pos + 1] != "[":
+            raise ValueError(f"{path}: expected a JSON array")
+        pos += 1
+
+        first = True
+        while True:
+            skip(_WHITESPACE)
+            if buf[pos:pos + 1] == "]":
+                return
+            if not first:
+                if buf[pos:pos + 1] != ",":
+                    raise ValueError(f"{path}: expected ',' or ']' at offset {pos} of the current chunk")
+                pos += 1
+                skip(_WHITESPACE)
+            first = False
+
+            while True:
+                try:
+                    value, end = _decoder.raw_decode(buf, pos)
+                    # A value running to the end of the buffer may be cut short,
+                    # and a number even before it ("1." decodes as 1 until the
+                    # "5" arrives), so only trust it once something else follows.
+                    stop = end
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        while stop < len(buf) and buf[stop] in _NUMBER_CHARS:
+                            stop += 1
+                    if stop < len(buf) or eof:
+                        break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                fill()
+            pos = end
+            yield value
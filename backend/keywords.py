@@ -0,0 +1,50 @@
+"""Review keywords used for scraping filters and location facets.
+
+A trigger on ``reviews`` counts, per location, how many reviews mention
+each keyword as they are stored (see ``sql/006_location_keyword_counts_trigger.sql``,
+which mirrors this list and matcher), and the API filters on those counts
+with ``/api/locations?keyword=``.  The scraper keeps reviews containing any
+keyword anywhere, a looser test than the matcher's, so it errs on the side
+of keeping a review.
+"""
+
+import re
+
+# Keywords to look for in reviews (case-insensitive).
+# A review is saved if it contains ANY of these words.
+KEYWORDS = [
+    "hookah", "shisha", "cigar", "pipe", "tobacco",
+    "vape", "e-liquid", "disposable", "rolling papers",
+    "glass", "bong", "grinder", "kratom", "CBD",
+    "friendly", "selection", "price", "cheap", "expensive",
+    "discount", "quality", "service", "recommend",
+]
+
+# Words that start with a keyword without being about it ("pipeline" is not a pipe).
+EXCLUDED_WORDS = ("pipeline", "bongo")
+
+
+class KeywordMatcher:
+    """Finds words starting with a keyword in one regex pass.
+
+    A keyword matches at the start of a word and covers its inflections and
+    compounds ("recommended", "cigarettes"), except for ``excluded`` words.
+    Keywords are reported in their canonical lower-case form.
+    """
+
+    def __init__(self, keywords: list[str], excluded: tuple[str, ...] = EXCLUDED_WORDS):
+        self.keywords = [kw.lower() for kw in keywords]
+        # Longest first, so "rolling papers" wins over any shorter overlap.
+        alternation = "|".join(re.escape(kw) for kw in sorted(self.keywords, key=len, reverse=True))
+        exclusion = "|".join(re.escape(word) for word in excluded)
+        lookahead = f"(?!{exclusion})" if exclusion else ""
+        self._re = re.compile(rf"\b{lookahead}({alternation})\w*", re.IGNORECASE)
+
+    def find(self, text: str) -> list[str]:
+        """Distinct keywords mentioned in ``text``, in order of first mention."""
+        if not text:
+            return []
+        return list(dict.fromkeys(m.group(1).lower() for m in self._re.finditer(text)))
+
+
+matcher = KeywordMatcher(KEYWORDS)
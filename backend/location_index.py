@@ -0,0 +1,328 @@
+"""In-memory spatial index over the ``locations`` table.
+
+Every API worker keeps its own snapshot of all locations, bucketed into a
+fixed lat/long grid, so map lookups never leave the process.  The snapshot is
+rebuilt in a background thread and swapped in with a single assignment, which
+keeps readers lock-free.  Coordinates are also kept as NumPy arrays so exact
+bounds and great-circle distances are computed in one vectorized pass over
+the grid candidates.  Each record is also JSON-encoded once per snapshot, so
+list responses are built by joining cached fragments instead of re-encoding.
+"""
+
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Grid cell edge in degrees (~3.5 miles of latitude).
+GRID_CELL_DEG = 0.05
+
+# How often the background thread reloads the snapshot.
+REFRESH_SECONDS = 300
+# How often it checks whether a write has moved the data version.
+VERSION_POLL_SECONDS = 5
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEG_LAT = 69.0
+
+
+def join_fragments(fragments) -> bytes:
+    """JSON array body from already-encoded JSON values."""
+    return b"[" + b",".join(fragments) + b"]"
+
+
+def with_distance(fragment: bytes, distance: float) -> bytes:
+    """Append a ``distanceMiles`` member to an encoded JSON object."""
+    return fragment[:-1] + b',"distanceMiles":' + orjson.dumps(distance) + b"}"
+
+
+def _cell(lat: float, lng: float) -> tuple[int, int]:
+    return math.floor(lat / GRID_CELL_DEG), math.floor(lng / GRID_CELL_DEG)
+
+
+def haversine_miles(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Great-circle distance in miles from one point to arrays of points (all in radians)."""
+    a = (np.sin((lats - lat) / 2) ** 2
+         + math.cos(lat) * np.cos(lats) * np.sin((lngs - lng) / 2) ** 2)
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def radius_bbox(lat: float, lng: float, radius_miles: float) -> tuple[float, float, float, float]:
+    """Smallest lat/long box containing the circle, as (min_lat, min_lng, max_lat, max_lng)."""
+    lat_radius = radius_miles / MILES_PER_DEG_LAT
+    lng_radius = radius_miles / (MILES_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - lat_radius, lng - lng_radius, lat + lat_radius, lng + lng_radius
+
+
+@dataclass(frozen=True)
+class LocationFilter:
+    """Attribute filters applied alongside the spatial lookup.
+
+    Locations without a rating or risk score never pass a filter on that field.
+    ``keywords`` only passes locations with reviews mentioning every keyword.
+    """
+
+    min_rating: Optional[float] = None
+    max_risk: Optional[float] = None
+    min_reviews: Optional[int] = None
+    keywords: tuple[str, ...] = ()
+
+    def __bool__(self) -> bool:
+        return bool(self.keywords) or any(
+            v is not None for v in (self.min_rating, self.max_risk, self.min_reviews)
+        )
+
+
+class _Snapshot:
+    """Immutable view of all locations at one point in time."""
+
+    __slots__ = ("records", "version", "ids", "lats", "lngs", "lat_rad", "lng_rad",
+                 "ratings", "risks", "review_counts", "keyword_masks", "grid", "fragments", "loaded_at")
+
+    def __init__(self, records: list[dict], version: int):
+        self.records = records
+        self.version = version
+        self.ids = np.array([r["id"] for r in records], dtype=np.int64)
+        self.lats = np.array([r["lat"] for r in records], dtype=np.float64)
+        self.lngs = np.array([r["lng"] for r in records], dtype=np.float64)
+        self.lat_rad = np.radians(self.lats)
+        self.lng_rad = np.radians(self.lngs)
+        # Filter columns; NaN stands in for a missing rating or risk score.
+        self.ratings = np.array([r.get("rating") for r in records], dtype=np.float64)
+        self.risks = np.array([r.get("riskScore") for r in records], dtype=np.float64)
+        self.review_counts = np.array([r.get("reviewCount") or 0 for r in records], dtype=np.int64)
+        # Keyword facet -> which records have reviews mentioning it.
+        self.keyword_masks: dict[str, np.ndarray] = {}
+        for i, rec in enumerate(records):
+            for kw in rec.get("keywords") or ():
+                self.keyword_masks.setdefault(kw, np.zeros(len(records), dtype=bool))[i] = True
+
+        cells: dict[tuple[int, int], list[int]] = {}
+        for i, rec in enumerate(records):
+            cells.setdefault(_cell(rec["lat"], rec["lng"]), []).append(i)
+        self.grid = {c: np.array(ids, dtype=np.int64) for c, ids in cells.items()}
+        # Response-ready JSON of each record, encoded once per snapshot.
+        self.fragments = [orjson.dumps(r) for r in records]
+        self.loaded_at = time.time()
+
+    def candidates(
+        self, min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+        filters: Optional[LocationFilter] = None,
+    ) -> np.ndarray:
+        """Indices of every record inside the box (edges inclusive) that passes ``filters``."""
+        lo_y, lo_x = _cell(min_lat, min_lng)
+        hi_y, hi_x = _cell(max_lat, max_lng)
+        if (hi_y - lo_y + 1) * (hi_x - lo_x + 1) > len(self.grid):
+            # Zoomed far out: walking the occupied cells is cheaper than the range.
+            buckets = [ids for c, ids in self.grid.items()
+                       if lo_y <= c[0] <= hi_y and lo_x <= c[1] <= hi_x]
+        else:
+            buckets = [self.grid[c] for c in
+                       ((cy, cx) for cy in range(lo_y, hi_y + 1) for cx in range(lo_x, hi_x + 1))
+                       if c in self.grid]
+        if not buckets:
+            return np.empty(0, dtype=np.int64)
+
+        idx = np.concatenate(buckets)
+        lats, lngs = self.lats[idx], self.lngs[idx]
+        keep = (lats >= min_lat) & (lats <= max_lat) & (lngs >= min_lng) & (lngs <= max_lng)
+        if filters:
+            if filters.min_rating is not None:
+                keep &= self.ratings[idx] >= filters.min_rating
+            if filters.max_risk is not None:
+                keep &= self.risks[idx] <= filters.max_risk
+            if filters.min_reviews is not None:
+                keep &= self.review_counts[idx] >= filters.min_reviews
+            for kw in filters.keywords:
+                mask = self.keyword_masks.get(kw)
+                if mask is None:
+                    return np.empty(0, dtype=np.int64)
+                keep &= mask[idx]
+        return idx[keep]
+
+
+class LocationIndex:
+    """Grid index of location records, refreshed from ``loader`` in the background.
+
+    ``loader`` returns the full list of records in the response shape served by
+    ``/api/locations``; each record must carry numeric ``lat`` and ``lng``.
+    ``version_source`` returns the shared data version; when it moves the
+    snapshot is reloaded without waiting for the periodic refresh.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], list[dict]],
+        version_source: Callable[[], int] = lambda: 0,
+        refresh_seconds: float = REFRESH_SECONDS,
+    ):
+        self._loader = loader
+        self._version_source = version_source
+        self._refresh_seconds = refresh_seconds
+        self._snapshot: Optional[_Snapshot] = None
+        self._listeners: list[Callable[[list[dict]], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._snapshot is not None
+
+    def __len__(self) -> int:
+        snap = self._snapshot
+        return len(snap.records) if snap else 0
+
+    @property
+    def version(self) -> int:
+        """Data version the current snapshot was loaded at (-1 before the first load)."""
+        snap = self._snapshot
+        return snap.version if snap else -1
+
+    def add_listener(self, callback: Callable[[list[dict]], None]) -> None:
+        """Call ``callback(records)`` after every successful refresh, e.g. to rebuild derived indexes."""
+        self._listeners.append(callback)
+
+    def refresh(self) -> None:
+        """Reload every location and atomically replace the current snapshot."""
+        started = time.perf_counter()
+        # Read the version first: a write landing mid-load triggers another refresh.
+        version = self._version_source()
+        records = [r for r in self._loader() if r.get("lat") is not None and r.get("lng") is not None]
+        self._snapshot = _Snapshot(records, version)
+        for callback in self._listeners:
+            callback(records)
+        logger.info("Location index loaded %d locations in %.0f ms",
+                    len(records), (time.perf_counter() - started) * 1000)
+
+    def start(self) -> None:
+        """Load the first snapshot, then keep refreshing it in a daemon thread."""
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("Initial location index load failed; retrying in background")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="location-index", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        last_refresh = time.monotonic()
+        while not self._stop.wait(min(VERSION_POLL_SECONDS, self._refresh_seconds)):
+            try:
+                due = time.monotonic() - last_refresh >= self._refresh_seconds
+                if due or self._version_source() != self.version:
+                    last_refresh = time.monotonic()
+                    self.refresh()
+            except Exception:
+                logger.exception("Location index refresh failed; keeping previous snapshot")
+
+    @staticmethod
+    def _bbox_indices(
+        snap: _Snapshot, bbox: tuple[float, float, float, float], filters: Optional[LocationFilter],
+        limit: Optional[int], after_id: Optional[int],
+    ) -> np.ndarray:
+        idx = snap.candidates(*bbox, filters)
+        if limit is not None:
+            ids = snap.ids[idx]
+            if after_id is not None:
+                idx, ids = idx[ids > after_id], ids[ids > after_id]
+            idx = idx[np.argsort(ids, kind="stable")[:limit]]
+        return idx
+
+    @staticmethod
+    def _radius_indices(
+        snap: _Snapshot, lat: float, lng: float, radius_miles: float, filters: Optional[LocationFilter],
+        limit: Optional[int], after: Optional[tuple[float, int]],
+    ) -> tuple[np.ndarray, np.ndarray]:
+        idx = snap.candidates(*radius_bbox(lat, lng, radius_miles), filters)
+        dist = haversine_miles(math.radians(lat), math.radians(lng), snap.lat_rad[idx], snap.lng_rad[idx])
+        keep = dist <= radius_miles
+        # Order and page on the distance clients see, so a page's last item is its cursor.
+        idx, dist = idx[keep], np.round(dist[keep], 2)
+        ids = snap.ids[idx]
+        if after is not None:
+            later = (dist > after[0]) | ((dist == after[0]) & (ids > after[1]))
+            idx, dist, ids = idx[later], dist[later], ids[later]
+        order = np.lexsort((ids, dist))[:limit]
+        return idx[order], dist[order]
+
+    def query_bbox(
+        self, min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+        filters: Optional[LocationFilter] = None,
+        limit: Optional[int] = None, after_id: Optional[int] = None,
+    ) -> list[dict]:
+        """Return records inside the box (edges inclusive) that pass ``filters``.
+
+        With ``limit`` results are ordered by id and start after ``after_id``,
+        so callers can page through a viewport with a keyset cursor.
+        """
+        snap = self._snapshot
+        if snap is None:
+            return []
+        idx = self._bbox_indices(snap, (min_lat, min_lng, max_lat, max_lng), filters, limit, after_id)
+        return [snap.records[i] for i in idx.tolist()]
+
+    def query_radius(
+        self, lat: float, lng: float, radius_miles: float, filters: Optional[LocationFilter] = None,
+        limit: Optional[int] = None, after: Optional[tuple[float, int]] = None,
+    ) -> list[dict]:
+        """Return records within ``radius_miles`` of the point, nearest first.
+
+        Each result is a copy of the record with a ``distanceMiles`` field added.
+        Results are ordered by (``distanceMiles``, ``id``); ``after`` is the
+        pair of the last record of the previous page and ``limit`` caps the page.
+        """
+        snap = self._snapshot
+        if snap is None:
+            return []
+        idx, dist = self._radius_indices(snap, lat, lng, radius_miles, filters, limit, after)
+        return [
+            {**snap.records[i], "distanceMiles": d}
+            for i, d in zip(idx.tolist(), dist.tolist())
+        ]
+
+    def query_bbox_json(
+        self, min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+        filters: Optional[LocationFilter] = None, limit: int = 1000, after_id: Optional[int] = None,
+    ) -> tuple[bytes, Optional[list]]:
+        """One page of ``query_bbox`` as an encoded JSON array, plus the next page's cursor key.
+
+        The cursor key is ``[id]`` of the page's last record, or ``None`` when
+        nothing follows it.
+        """
+        snap = self._snapshot
+        if snap is None:
+            return b"[]", None
+        idx = self._bbox_indices(snap, (min_lat, min_lng, max_lat, max_lng), filters, limit + 1, after_id)
+        next_key = [int(snap.ids[idx[limit - 1]])] if len(idx) > limit else None
+        return join_fragments(snap.fragments[i] for i in idx[:limit].tolist()), next_key
+
+    def query_radius_json(
+        self, lat: float, lng: float, radius_miles: float, filters: Optional[LocationFilter] = None,
+        limit: int = 1000, after: Optional[tuple[float, int]] = None,
+    ) -> tuple[bytes, Optional[list]]:
+        """One page of ``query_radius`` as an encoded JSON array, plus the next page's cursor key.
+
+        The cursor key is ``[distanceMiles, id]`` of the page's last record,
+        or ``None`` when nothing follows it.
+        """
+        snap = self._snapshot
+        if snap is None:
+            return b"[]", None
+        idx, dist = self._radius_indices(snap, lat, lng, radius_miles, filters, limit + 1, after)
+        next_key = [float(dist[limit - 1]), int(snap.ids[idx[limit - 1]])] if len(idx) > limit else None
+        return join_fragments(
+            with_distance(snap.fragments[i], d) for i, d in zip(idx[:limit].tolist(), dist[:limit].tolist())
+        ), next_key
@@ -1,186 +1,530 @@
+import asyncio
+import base64
+import json
 import math
+import time
+from contextlib import asynccontextmanager, contextmanager
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from supabase import create_client, Client
-from typing import Optional
-import requests
+from typing import Literal, Optional
 
-url: str = "https://iofbbgeonizbqvvntely.supabase.co/"
-key: str = "sb_publishable_d8ETrLfDZDFCqKT58AdOUQ_e3n5LHnU"
-supabase: Client = create_client(url, key)
+import httpx
+import orjson
+from pydantic import BaseModel, Field
+
+from clusters import ClusterIndex
+from compression import MINIMUM_SIZE, CompressionMiddleware, compress, negotiate
+from geocode import GeocodeBusy, GeocodeCache, Geocoder, RateLimiter
+from invalidation import DataVersions
+from keywords import matcher as keyword_matcher
+from location_index import LocationFilter, LocationIndex
+from repository import MAX_CONNECTIONS, Repository, ReviewSort, create_repository
+from response_cache import ResponseCache
+from search import SearchIndex
+import tiles
+
+# Data access (Supabase or direct Postgres, see repository.py), opened in lifespan().
+repo: Optional[Repository] = None
+# Event loop the repository belongs to; the index loader thread submits to it.
+loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Upper bound on in-flight database requests per worker; extra requests wait
+# for a slot instead of opening more connections.
+DB_MAX_CONCURRENCY = MAX_CONNECTIONS
+db_slots = asyncio.Semaphore(DB_MAX_CONCURRENCY)
 
 SEARCH_MILE_RADIUS = 3
+MAX_SEARCH_MILE_RADIUS = 50
 
-app = FastAPI()
+DEFAULT_PAGE_LIMIT = 200
+MAX_PAGE_LIMIT = 1000
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # fine for local dev
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Reviews embedded in the detail response; the rest are paged via /reviews.
+DETAIL_REVIEWS = 10
+DEFAULT_REVIEWS_LIMIT = 20
+MAX_REVIEWS_LIMIT = 100
+# Rows per database request when streaming reviews as NDJSON.
+REVIEWS_STREAM_CHUNK = 500
 
+MAX_BATCH_IDS = 100
 
-def _avg_rating(reviews: list[dict]) -> Optional[float]:
-    ratings = [r["rating"] for r in reviews if r.get("rating") is not None]
-    if not ratings:
-        return None
-    return round(sum(ratings) / len(ratings), 1)
-
-
-def geocode_address(address: str) -> Optional[str]:
-    res = requests.get(
-        "https://nominatim.openstreetmap.org/search",
-        params={
-            "q": address,
-            "format": "json",
-            "limit": 1,
-            "countrycodes": "us",
-        },
-        headers={
-            "User-Agent": "SinMaps/1.0"  # REQUIRED by Nominatim
-        },
-        timeout = 10,
-    )
-    res.raise_for_status()
-    data = res.json()
-    if not data:
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+
+def _stats_rating(stats: Optional[dict]) -> Optional[float]:
+    """Average rating from a location_rating_stats row."""
+    if not stats or not stats.get("rating_count"):
         return None
-    return float(data[0]["lat"]), float(data[0]["lon"])
+    return round(float(stats["rating_sum"]) / stats["rating_count"], 1)
 
-@app.get("/api/locations")
-def get_locations(address: str, rating: Optional[float] = None,)  -> list[dict]:
-    print(address)
-    """Return all locations with their first image and average review rating."""
-    lat, lon = geocode_address(address)
-
-    lat_radius = SEARCH_MILE_RADIUS / 69.0
-    lon_radius = SEARCH_MILE_RADIUS / (69.0 * math.cos(math.radians(lat)))
-
-    response = (
-        supabase
-        .table("locations")
-        .select("location_id, name, lat, long, addr, location_images(image_url), reviews(rating)")
-        .gte("lat", lat - lat_radius)
-        .lte("lat", lat + lat_radius)
-        .gte("long", lon - lon_radius)
-        .lte("long", lon + lon_radius)
-    )
-    print(rating)
-    if rating:
-        response.eq("rating", rating)
 
-    response = response.execute()
-    locations = response.data or []
+@contextmanager
+def _stage(timings: dict[str, float], name: str):
+    """Record how long the block takes, in ms, under ``name``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = (time.perf_counter() - start) * 1000
 
-    result = []
-    for loc in locations:
-        # Skip locations without valid coordinates
-        if loc.get("lat") is None or loc.get("long") is None:
-            continue
 
+def _server_timing(timings: dict[str, float]) -> str:
+    """Format stage timings as a Server-Timing header value."""
+    return ", ".join(f"{name};dur={ms:.1f}" for name, ms in timings.items())
+
+
+def _load_location_records() -> list[dict]:
+    """Load every location and shape it like the /api/locations response.
+
+    Runs on the index's loader thread; the query itself runs on the app's
+    event loop, which owns the repository's connections.
+    """
+    rows = asyncio.run_coroutine_threadsafe(repo.list_locations(), loop).result()
+
+    result = []
+    for loc in rows:
         images = loc.get("location_images") or []
-        reviews = loc.get("reviews") or []
+        stats = loc.get("location_rating_stats")
+        risks = loc.get("risk_reports") or []
+        keywords = loc.get("location_keyword_counts") or []
         image_url = images[0]["image_url"] if images and images[0].get("image_url") else None
 
         result.append({
             "id": loc["location_id"],
             "name": loc["name"],
-            "lat": loc["lat"],
-            "lng": loc["long"],
+            "lat": loc.get("lat"),
+            "lng": loc.get("long"),
             "addr": loc.get("addr"),
+            "category": loc.get("category"),
             "imageUrl": image_url,
-            "rating": _avg_rating(reviews),
-            "reviewCount": len(reviews),
+            "rating": _stats_rating(stats),
+            "reviewCount": stats["review_count"] if stats else 0,
+            "riskScore": risks[0].get("risk_score") if risks else None,
+            "keywords": {k["keyword"]: k["review_count"] for k in keywords if k["review_count"]},
         })
-
     return result
 
 
-@app.get("/api/locations/{location_id}")
-def get_location(location_id: int):
-    """Return a single location with all images, reviews, and risk report."""
-    loc_resp = (
-        supabase
-        .table("locations")
-        .select("location_id, name, lat, long, addr")
-        .eq("location_id", location_id)
-        .single()
-        .execute()
-    )
-    if not loc_resp.data:
-        raise HTTPException(status_code=404, detail="Location not found")
+def _load_review_texts() -> dict[int, list[str]]:
+    """Review text by location for the search index; runs on the loader thread."""
+    rows = asyncio.run_coroutine_threadsafe(repo.list_review_texts(), loop).result()
+    texts: dict[int, list[str]] = {}
+    for row in rows:
+        texts.setdefault(row["location_id"], []).append(row["review_content"])
+    return texts
 
-    loc = loc_resp.data
 
-    images_resp = (
-        supabase
-        .table("location_images")
-        .select("id, name, image_url")
-        .eq("location_id", location_id)
-        .execute()
-    )
+def _load_data_versions(after: int) -> list[dict]:
+    """Data versions newer than ``after``; runs on the loader thread."""
+    return asyncio.run_coroutine_threadsafe(repo.list_data_versions(after), loop).result()
 
-    reviews_resp = (
-        supabase
-        .table("reviews")
-        .select("review_id, review_content, rating")
-        .eq("location_id", location_id)
-        .execute()
-    )
 
-    risk_resp = (
-        supabase
-        .table("risk_reports")
-        .select("id, business_name, summary, risk_score, risk_reason")
-        .eq("location_id", location_id)
-        .execute()
+# Data versions in memory; the location index's poll refreshes them every few seconds.
+data_versions = DataVersions(_load_data_versions)
+location_index = LocationIndex(_load_location_records, version_source=data_versions.refresh)
+tile_cache = tiles.TileCache()
+response_cache = ResponseCache()
+cluster_index = ClusterIndex()
+location_index.add_listener(cluster_index.rebuild)
+# Rebuilt only when the data version moved, not on every timed refresh.
+search_index = SearchIndex(_load_review_texts, version_source=lambda: location_index.version)
+location_index.add_listener(search_index.rebuild)
+geocoder = Geocoder(GeocodeCache(), RateLimiter())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global repo, loop
+    loop = asyncio.get_running_loop()
+    repo = await create_repository()
+    # Off the loop: the first load waits on a query that runs on the loop.
+    await asyncio.to_thread(location_index.start)
+    await geocoder.start()
+    yield
+    await geocoder.aclose()
+    await asyncio.to_thread(location_index.stop)
+    await repo.aclose()
+
+
+async def _execute(call):
+    """Await a repository call while holding one of the worker's DB slots."""
+    async with db_slots:
+        return await call
+
+
+app = FastAPI(lifespan=lifespan)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # fine for local dev
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing", "ETag"],
+)
+app.add_middleware(CompressionMiddleware)
+
+
+async def geocode_address(address: str) -> tuple[float, float]:
+    """Geocode the address, mapping geocoder failures onto HTTP errors."""
+    try:
+        coords = await geocoder.geocode(address)
+    except GeocodeBusy as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Geocoding is busy, try again shortly",
+            headers={"Retry-After": str(max(1, round(e.retry_after)))},
+        )
+    except httpx.HTTPError:
+        raise HTTPException(status_code=502, detail="Geocoding service unavailable")
+    if coords is None:
+        raise HTTPException(status_code=404, detail="Address not found")
+    return coords
+
+
+def _parse_bbox(bbox: str) -> tuple[float, float, float, float]:
+    """Parse ``minLng,minLat,maxLng,maxLat`` into (min_lat, min_lng, max_lat, max_lng)."""
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="bbox must be minLng,minLat,maxLng,maxLat")
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        raise HTTPException(status_code=422, detail="bbox is out of range or inverted")
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def _encode_cursor(key: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+# Cursor key shapes, one allowed-types tuple per position.
+_RADIUS_CURSOR = ((int, float), (int,))  # distance, id
+_BBOX_CURSOR = ((int,),)  # id
+_REVIEWS_CURSOR = ((int, float, type(None)), (int,))  # rating (null when sorted by recency), review_id
+
+
+def _cursor_value_ok(value, types: tuple) -> bool:
+    if isinstance(value, bool) or not isinstance(value, types):
+        return False
+    return not isinstance(value, float) or math.isfinite(value)
+
+
+def _decode_cursor(cursor: str, shape: tuple) -> list:
+    """Decode a cursor from _encode_cursor whose key has ``shape``; 422 if it is not one."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        key = None
+    if not isinstance(key, list) or len(key) != len(shape) \
+            or not all(_cursor_value_ok(v, types) for v, types in zip(key, shape)):
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+    return key
+
+
+@app.get("/api/locations")
+async def get_locations(
+    address: Optional[str] = None,
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    bbox: Optional[str] = None,
+    radius: float = Query(SEARCH_MILE_RADIUS, gt=0, le=MAX_SEARCH_MILE_RADIUS),
+    min_rating: Optional[float] = Query(None, alias="minRating", ge=0, le=5),
+    max_risk: Optional[float] = Query(None, alias="maxRisk", ge=1, le=10),
+    min_reviews: Optional[int] = Query(None, alias="minReviews", ge=0),
+    keyword: Optional[list[str]] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+) -> Response:
+    """Return locations with their first image and average review rating.
+
+    Exactly one search mode is used:
+
+    - ``bbox=minLng,minLat,maxLng,maxLat``: everything in the map viewport.
+    - ``lat`` + ``lng``: within ``radius`` miles of the point, nearest first.
+    - ``address``: geocoded, then searched like ``lat`` + ``lng``.
+
+    Radius results carry ``distanceMiles``. Only the address mode calls the geocoder.
+    ``minRating``, ``maxRisk`` and ``minReviews`` filter on the precomputed
+    rating aggregates and risk score; locations missing the value are excluded.
+    ``keyword`` (repeatable) keeps locations with reviews mentioning every
+    given keyword, from the facet counts built at ingest. Each location
+    carries its counts as ``keywords``.
+
+    At most ``limit`` locations are returned. When more match, the
+    ``X-Next-Cursor`` response header holds a token; pass it back as
+    ``cursor`` with the same query to get the next page.
+
+    The body is joined from the index's pre-encoded location JSON.
+    """
+    if (lat is None) != (lng is None):
+        raise HTTPException(status_code=422, detail="lat and lng must be given together")
+    modes = sum(v is not None for v in (address, lat, bbox))
+    if modes != 1:
+        raise HTTPException(status_code=422, detail="Give exactly one of address, lat/lng or bbox")
+
+    if not location_index.ready:
+        raise HTTPException(status_code=503, detail="Location index is still loading")
+
+    keywords = tuple(dict.fromkeys(k.strip().lower() for k in keyword or ()))
+    unknown = [k for k in keywords if k not in keyword_matcher.keywords]
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown keyword {unknown[0]!r}; expected one of {', '.join(keyword_matcher.keywords)}",
+        )
+
+    filters = LocationFilter(
+        min_rating=min_rating, max_risk=max_risk, min_reviews=min_reviews, keywords=keywords
     )
 
-    reviews = reviews_resp.data or []
+    if bbox is not None:
+        after_id = _decode_cursor(cursor, _BBOX_CURSOR)[0] if cursor else None
+        body, next_key = location_index.query_bbox_json(*_parse_bbox(bbox), filters, limit=limit, after_id=after_id)
+    else:
+        after = tuple(_decode_cursor(cursor, _RADIUS_CURSOR)) if cursor else None
+        if address is not None:
+            lat, lng = await geocode_address(address)
+        body, next_key = location_index.query_radius_json(lat, lng, radius, filters, limit=limit, after=after)
+
+    headers = {"X-Next-Cursor": _encode_cursor(next_key)} if next_key is not None else None
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/locations/clusters")
+async def get_location_clusters(bbox: str, zoom: int = Query(..., ge=0, le=22)) -> Response:
+    """Return marker clusters for the viewport at a map zoom level.
+
+    Each item is either ``{"type": "cluster", lat, lng, count, rating}`` or a
+    location (same shape as /api/locations) tagged ``"type": "location"``.
+    Past the index's max zoom only locations are returned.
+    """
+    if not cluster_index.ready:
+        raise HTTPException(status_code=503, detail="Location index is still loading")
+    return Response(content=cluster_index.get_clusters_json(*_parse_bbox(bbox), zoom), media_type="application/json")
+
+
+@app.get("/api/search")
+async def search_locations(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+) -> list[dict]:
+    """Full-text search over location names, addresses and review text.
+
+    Results are locations (same shape as /api/locations), best match first,
+    with ``score`` and ``highlights``: ``{"field", "text", "matches"}`` where
+    ``field`` is name, addr or review and ``matches`` are ``[start, end)``
+    character ranges in ``text``. Every word must match; the last one also
+    matches as a prefix unless followed by a space.
+    """
+    if not search_index.ready:
+        raise HTTPException(status_code=503, detail="Search index is still loading")
+    return search_index.search(q, limit)
+
+
+@app.get("/api/tiles/{z}/{x}/{y}.mvt")
+def get_tile(z: int, x: int, y: int, request: Request) -> Response:
+    """Return one Mapbox Vector Tile of the locations layer.
+
+    Features carry name, rating, riskScore and category. Tiles are cached on
+    disk per data version, so writes from ingestion or risk analysis retire them.
+    Compressed tiles are cached alongside, so each is compressed only once.
+    """
+    if not 0 <= z <= tiles.MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    if not location_index.ready:
+        raise HTTPException(status_code=503, detail="Location index is still loading")
+
+    version = location_index.version
+    data = tile_cache.get(version, z, x, y)
+    cacheable = True
+    if data is None:
+        data = tiles.encode_tile(location_index.query_bbox(*tiles.tile_bbox(z, x, y)), z, x, y)
+        # Skip caching if the index was swapped while we were encoding.
+        cacheable = location_index.version == version
+        if cacheable:
+            tile_cache.put(version, z, x, y, data)
+
+    headers = {"Cache-Control": "public, max-age=60"}
+    if len(data) >= MINIMUM_SIZE:
+        headers["Vary"] = "Accept-Encoding"
+        encoding = negotiate(request.headers.get("accept-encoding"))
+        if encoding is not None:
+            encoded = tile_cache.get(version, z, x, y, encoding) if cacheable else None
+            if encoded is None:
+                encoded = compress(data, encoding)
+                if cacheable:
+                    tile_cache.put(version, z, x, y, encoded, encoding)
+            data = encoded
+            headers["Content-Encoding"] = encoding
+
+    return Response(content=data, media_type=tiles.MEDIA_TYPE, headers=headers)
+
+
+async def _cached_response(request: Request, key: tuple, location_id: int, build) -> Response:
+    """Serve a per-location response through the versioned response cache.
+
+    ``await build(timings)`` returns ``(status_code, content, headers)`` and
+    only runs on a miss; entries expire when a write moves the location's
+    data version, within one poll of the location index.
+    """
+    timings: dict[str, float] = {}
+    with _stage(timings, "cache"):
+        version = data_versions.get(location_id)
+        entry = response_cache.get(key, version)
+    if entry is None:
+        status_code, content, headers = await build(timings)
+        entry = response_cache.put(key, version, content, status_code, headers)
+    return entry.to_response(request, {"Server-Timing": _server_timing(timings)})
+
 
+def _review_key(review: dict, sort: ReviewSort) -> list:
+    return [None if sort == "recent" else review.get("rating"), review["review_id"]]
+
+
+def _rating_histogram(stats: Optional[dict]) -> dict[str, int]:
+    return {str(star): (stats or {}).get(f"rating_{star}", 0) for star in range(1, 6)}
+
+
+def _shape_detail(loc: dict) -> dict:
+    """Detail fields of a ``repo.get_locations`` row, without the embedded reviews."""
+    stats = loc.get("location_rating_stats")
+    risks = loc.get("risk_reports") or []
     return {
         "id": loc["location_id"],
         "name": loc["name"],
         "lat": loc.get("lat"),
         "lng": loc.get("long"),
         "addr": loc.get("addr"),
-        "images": images_resp.data or [],
-        "reviews": reviews,
-        "rating": _avg_rating(reviews),
-        "reviewCount": len(reviews),
-        "riskReport": risk_resp.data[0] if risk_resp.data else None,
+        "images": loc.get("location_images") or [],
+        "rating": _stats_rating(stats),
+        "reviewCount": stats["review_count"] if stats else 0,
+        "ratingHistogram": _rating_histogram(stats),
+        "riskReport": risks[0] if risks else None,
     }
 
 
+async def _build_location(location_id: int, timings: dict[str, float]) -> tuple[int, dict, None]:
+    with _stage(timings, "db"):
+        rows = await _execute(repo.get_locations([location_id], reviews=DETAIL_REVIEWS + 1))
+    if not rows:
+        return 404, {"detail": "Location not found"}, None
+
+    with _stage(timings, "shape"):
+        reviews = rows[0].get("reviews") or []
+        more = len(reviews) > DETAIL_REVIEWS
+        reviews = reviews[:DETAIL_REVIEWS]
+        return 200, {
+            **_shape_detail(rows[0]),
+            "reviews": reviews,
+            "reviewsNext": _encode_cursor(_review_key(reviews[-1], "recent")) if more else None,
+        }, None
+
+
+async def _build_reviews(
+    location_id: int, sort: ReviewSort, limit: int, after: Optional[tuple], timings: dict[str, float]
+) -> tuple[int, list, dict[str, str]]:
+    with _stage(timings, "db"):
+        reviews = await _execute(repo.list_reviews(location_id, sort, after, limit + 1))
+    headers = {}
+    if len(reviews) > limit:
+        reviews = reviews[:limit]
+        headers["X-Next-Cursor"] = _encode_cursor(_review_key(reviews[-1], sort))
+    return 200, reviews, headers
+
+
+async def _stream_reviews(location_id: int, sort: ReviewSort, after: Optional[tuple]):
+    """Yield every review from ``after`` on as NDJSON, one keyset page per query."""
+    while True:
+        page = await _execute(repo.list_reviews(location_id, sort, after, REVIEWS_STREAM_CHUNK))
+        for review in page:
+            yield orjson.dumps(review) + b"\n"
+        if len(page) < REVIEWS_STREAM_CHUNK:
+            return
+        after = tuple(_review_key(page[-1], sort))
+
+
+async def _build_risk_report(location_id: int, timings: dict[str, float]) -> tuple[int, dict, None]:
+    with _stage(timings, "db"):
+        report = await _execute(repo.get_risk_report(location_id))
+    if report is None:
+        return 404, {"detail": "No risk report found for this location"}, None
+    return 200, report, None
+
+
+class BatchRequest(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+
+@app.post("/api/locations/batch")
+async def get_locations_batch(body: BatchRequest, response: Response) -> list[dict]:
+    """Return detail for many locations at once, in the order requested.
+
+    Each item has the detail fields (images, rating summary, histogram and
+    risk report) but no embedded reviews; page those via /reviews. All
+    locations are resolved in one set-based select. Unknown ids are skipped.
+    """
+    ids = list(dict.fromkeys(body.ids))
+    timings: dict[str, float] = {}
+    with _stage(timings, "db"):
+        rows = await _execute(repo.get_locations(ids))
+    with _stage(timings, "shape"):
+        by_id = {row["location_id"]: _shape_detail(row) for row in rows}
+        result = [by_id[i] for i in ids if i in by_id]
+    response.headers["Server-Timing"] = _server_timing(timings)
+    return result
+
+
+@app.get("/api/locations/{location_id}")
+async def get_location(location_id: int, request: Request):
+    """Return a single location with its images, risk report and newest reviews.
+
+    Only the first ``DETAIL_REVIEWS`` reviews are embedded, with
+    ``reviewsNext`` as the /reviews cursor for the rest; ``rating``,
+    ``reviewCount`` and ``ratingHistogram`` cover all of them.
+
+    Everything comes back from one embedded select. Responses are cached per
+    data version with a strong ETag; ``If-None-Match`` gets a 304. The
+    Server-Timing header breaks the request down into its stages.
+    """
+    return await _cached_response(
+        request, ("detail", location_id), location_id, lambda t: _build_location(location_id, t)
+    )
+
+
 @app.get("/api/locations/{location_id}/reviews")
-def get_reviews(location_id: int):
-    """Return all reviews for a location."""
-    response = (
-        supabase
-        .table("reviews")
-        .select("review_id, review_content, rating")
-        .eq("location_id", location_id)
-        .execute()
+async def get_reviews(
+    location_id: int,
+    request: Request,
+    sort: ReviewSort = "recent",
+    limit: int = Query(DEFAULT_REVIEWS_LIMIT, ge=1, le=MAX_REVIEWS_LIMIT),
+    cursor: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
+):
+    """Return a page of reviews for a location.
+
+    Pages hold up to ``limit`` reviews ordered by ``sort``; the
+    ``X-Next-Cursor`` header, passed back as ``cursor``, fetches the next one.
+    ``format=ndjson`` instead streams every remaining review, one JSON object
+    per line, ignoring ``limit``.
+    """
+    after = tuple(_decode_cursor(cursor, _REVIEWS_CURSOR)) if cursor else None
+    if format == "ndjson":
+        return StreamingResponse(_stream_reviews(location_id, sort, after), media_type="application/x-ndjson")
+    return await _cached_response(
+        request, ("reviews", location_id, sort, limit, cursor), location_id,
+        lambda t: _build_reviews(location_id, sort, limit, after, t),
     )
-    return response.data or []
 
 
 @app.get("/api/locations/{location_id}/risk-report")
-def get_risk_report(location_id: int):
+async def get_risk_report(location_id: int, request: Request):
     """Return the risk report for a location."""
-    response = (
-        supabase
-        .table("risk_reports")
-        .select("id, business_name, summary, risk_score, risk_reason")
-        .eq("location_id", location_id)
-        .execute()
+    return await _cached_response(
+        request, ("risk-report", location_id), location_id, lambda t: _build_risk_report(location_id, t)
     )
-    if not response.data:
-        raise HTTPException(status_code=404, detail="No risk report found for this location")
-    return response.data[0]
 
 
 if __name__ == "__main__":
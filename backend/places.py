@@ -0,0 +1,176 @@
+"""In-memory entity resolution for places seen in different sources.
+
+Extraction files, review dumps and risk reports all name the same places,
+but not always the same way: branches of a chain share a name, and spellings
+drift ("Ken's SOS Liquors" vs "Kens SOS Liquor").  ``PlaceIndex`` resolves a
+record to a known place without a database query:
+
+1. by a source id, when the record has one: Google ``place_id``, ``cid``, or
+   the feature part of a ``fid`` (review dumps carry only that part);
+2. with coordinates, by the same normalized name within ``MATCH_RADIUS_M``,
+   else the most similar name there, looking only at places in the
+   neighbouring grid cells (the blocking that keeps fuzzy matching cheap);
+3. without coordinates, by normalized name when exactly one place has it,
+   else the most similar name among places sharing a name token.
+
+Names shared by several places (chains) resolve by name alone to nothing,
+rather than to an arbitrary branch.
+"""
+
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Hashable, Optional
+
+# Grid cell size for spatial blocking (degrees); must span more than MATCH_RADIUS_M.
+CELL_DEG = 0.005
+# Furthest two records of one place may be apart (metres).
+MATCH_RADIUS_M = 250.0
+# Lowest name similarity (0-1, on normalized names) that counts as the same place.
+FUZZY_THRESHOLD = 0.85
+
+_NOISE_WORDS = {"the", "llc", "inc", "co", "corp", "ltd"}
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_EARTH_RADIUS_M = 6_371_000.0
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Lower-case, accent- and punctuation-free name with corporate noise words dropped."""
+    if not name:
+        return ""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c)).lower().replace("&", " and ")
+    return " ".join(w for w in _PUNCT_RE.sub("", name).split() if w not in _NOISE_WORDS)
+
+
+def fid_feature(fid: Optional[str]) -> Optional[str]:
+    """Feature part of a ``0x…:0x…`` fid, shared by the fid-style ids in review dumps."""
+    if not fid:
+        return None
+    feature = fid.split(":", 1)[0]
+    return feature if feature not in ("", "0x0") else None
+
+
+def _distance_m(lat1: float, long1: float, lat2: float, long2: float) -> float:
+    # Equirectangular; exact enough at a few hundred metres.
+    x = math.radians(long2 - long1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return _EARTH_RADIUS_M * math.hypot(x, y)
+
+
+class _Place:
+    __slots__ = ("ref", "norm", "lat", "long", "place_id", "cid")
+
+    def __init__(self, ref, norm, lat, long, place_id, cid):
+        self.ref = ref
+        self.norm = norm
+        self.lat = lat
+        self.long = long
+        self.place_id = place_id
+        self.cid = cid
+
+    def compatible(self, place_id: Optional[str], cid: Optional[str]) -> bool:
+        """False when both sides have an id of one kind and they differ."""
+        return not (place_id and self.place_id and place_id != self.place_id) \
+            and not (cid and self.cid and cid != self.cid)
+
+
+class PlaceIndex:
+    """Resolves place records to the ``ref`` of a known place; refs are the caller's keys."""
+
+    def __init__(self, cell_deg: float = CELL_DEG):
+        self.cell_deg = cell_deg
+        self._places: list[_Place] = []
+        self._by_id: dict[str, Hashable] = {}
+        self._by_name: dict[str, list[_Place]] = defaultdict(list)
+        self._by_cell: dict[tuple[int, int], list[_Place]] = defaultdict(list)
+        self._by_token: dict[str, list[_Place]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self._places)
+
+    def _cell(self, lat: float, long: float) -> tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(long / self.cell_deg)
+
+    def add(self, ref: Hashable, name: Optional[str], lat: Optional[float] = None, long: Optional[float] = None,
+            place_id: Optional[str] = None, cid: Optional[str] = None, fid: Optional[str] = None) -> None:
+        """Index a place under ``ref``; ids already taken by another place are left to it."""
+        place = _Place(ref, normalize_name(name), lat, long, place_id or None, cid or None)
+        self._places.append(place)
+        for key in (place_id and f"place:{place_id}", cid and f"cid:{cid}",
+                    fid_feature(fid) and f"fid:{fid_feature(fid)}"):
+            if key:
+                self._by_id.setdefault(key, ref)
+        if place.norm:
+            self._by_name[place.norm].append(place)
+            for token in set(place.norm.split()):
+                self._by_token[token].append(place)
+        if lat is not None and long is not None:
+            self._by_cell[self._cell(lat, long)].append(place)
+
+    def resolve(self, name: Optional[str], lat: Optional[float] = None, long: Optional[float] = None,
+                place_id: Optional[str] = None, cid: Optional[str] = None,
+                fid: Optional[str] = None) -> Optional[Hashable]:
+        """``ref`` of the known place this record describes, or ``None``."""
+        for key in (place_id and f"place:{place_id}", cid and f"cid:{cid}",
+                    fid_feature(fid) and f"fid:{fid_feature(fid)}"):
+            if key and key in self._by_id:
+                return self._by_id[key]
+
+        norm = normalize_name(name)
+        if not norm:
+            return None
+        if lat is not None and long is not None:
+            return self._resolve_nearby(norm, lat, long, place_id or None, cid or None)
+        return self._resolve_by_name(norm, place_id or None, cid or None)
+
+    def _resolve_nearby(self, norm: str, lat: float, long: float,
+                        place_id: Optional[str], cid: Optional[str]) -> Optional[Hashable]:
+        row, col = self._cell(lat, long)
+        best, best_key = None, None
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                for place in self._by_cell.get((row + d_row, col + d_col), ()):
+                    if not place.compatible(place_id, cid):
+                        continue
+                    distance = _distance_m(lat, long, place.lat, place.long)
+                    if distance > MATCH_RADIUS_M:
+                        continue
+                    similarity = 1.0 if place.norm == norm else SequenceMatcher(None, norm, place.norm).ratio()
+                    if similarity < FUZZY_THRESHOLD:
+                        continue
+                    # Most similar name first, then nearest.
+                    key = (similarity, -distance)
+                    if best_key is None or key > best_key:
+                        best, best_key = place.ref, key
+        if best is not None:
+            return best
+        # Places stored without coordinates can still match by name.
+        refs = {p.ref for p in self._by_name.get(norm, ()) if p.lat is None and p.compatible(place_id, cid)}
+        return refs.pop() if len(refs) == 1 else None
+
+    def _resolve_by_name(self, norm: str, place_id: Optional[str], cid: Optional[str]) -> Optional[Hashable]:
+        refs = {p.ref for p in self._by_name.get(norm, ()) if p.compatible(place_id, cid)}
+        if refs:
+            return refs.pop() if len(refs) == 1 else None
+
+        # Fuzzy match, blocked on shared name tokens.
+        scores: dict[Hashable, float] = {}
+        seen: set[int] = set()
+        for token in set(norm.split()):
+            for place in self._by_token.get(token, ()):
+                if id(place) in seen or not place.compatible(place_id, cid):
+                    continue
+                seen.add(id(place))
+                similarity = SequenceMatcher(None, norm, place.norm).ratio()
+                if similarity >= FUZZY_THRESHOLD:
+                    scores[place.ref] = max(similarity, scores.get(place.ref, 0.0))
+        if not scores:
+            return None
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        # A tie between different places is as ambiguous as a shared name.
+        if len(ranked) > 1 and ranked[1][1] == ranked[0][1]:
+            return None
+        return ranked[0][0]
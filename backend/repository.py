@@ -0,0 +1,566 @@
+"""Data access for locations, reviews, images and risk reports.
+
+The API and the offline writers talk to a ``Repository`` rather than to a
+database client directly.  Two backends implement it:
+
+- ``SupabaseRepository`` goes through PostgREST with the async Supabase client.
+- ``SqlRepository`` queries Postgres directly through a pooled SQLAlchemy
+  engine on the ``app.core.config`` database, skipping the HTTP hop.  With a local database
+  (``sql/000_base_schema.sql`` plus the numbered migrations) everything runs
+  offline, which is what tests and benchmarks want.
+
+``create_repository`` picks one from ``REPOSITORY_BACKEND`` ("supabase" by
+default, or "sql").  Rows come back as dicts keyed by column name, with
+related rows nested under their table's name, the way PostgREST embeds them.
+"""
+
+import asyncio
+import json
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Any, Literal, Optional
+
+import httpx
+
+ReviewSort = Literal["recent", "rating_desc", "rating_asc"]
+
+REPOSITORY_BACKEND = os.environ.get("REPOSITORY_BACKEND", "supabase")
+SUPABASE_URL = os.environ.get("SUPABASE_URL", "https://iofbbgeonizbqvvntely.supabase.co/")
+SUPABASE_KEY = os.environ.get("SUPABASE_KEY", "sb_publishable_d8ETrLfDZDFCqKT58AdOUQ_e3n5LHnU")
+
+# Upper bound on pooled connections per process, for either backend.
+MAX_CONNECTIONS = 64
+TIMEOUT = 10
+
+# PostgREST caps a single response at 1000 rows.
+PAGE_SIZE = 1000
+# Location ids per ``in`` filter, to keep request URLs short.
+ID_CHUNK = 200
+# Rows per bulk write; one request or statement each.
+WRITE_CHUNK = 500
+
+
+class Repository(ABC):
+    """Reads for the API and writes for ingestion and risk analysis."""
+
+    # ── Reads ──
+
+    @abstractmethod
+    async def list_locations(self) -> list[dict]:
+        """Every location with ``location_images(image_url)``, ``risk_reports(risk_score)``,
+        ``location_rating_stats(review_count, rating_count, rating_sum)`` and
+        ``location_keyword_counts(keyword, review_count)``, by id."""
+
+    @abstractmethod
+    async def get_locations(self, ids: list[int], reviews: int = 0) -> list[dict]:
+        """Detail rows for the given ids, in no particular order; unknown ids are left out.
+
+        Each row embeds all ``location_images``, ``risk_reports`` and the full
+        ``location_rating_stats`` row.  With ``reviews`` the newest that many
+        ``reviews`` are embedded too.
+        """
+
+    @abstractmethod
+    async def list_reviews(
+        self, location_id: int, sort: ReviewSort, after: Optional[tuple], size: int
+    ) -> list[dict]:
+        """One keyset page of a location's reviews.
+
+        Pages are ordered by ``sort`` then newest ``review_id`` first (ids grow
+        with ingestion, so "recent" means most recently loaded); unrated
+        reviews sort last.  ``after`` is the ``(rating, review_id)`` of the
+        previous page's last row, with ``rating`` unused for "recent".
+        """
+
+    @abstractmethod
+    async def get_risk_report(self, location_id: int) -> Optional[dict]:
+        """The location's risk report, or ``None``."""
+
+    @abstractmethod
+    async def list_locations_with_reviews(self) -> list[dict]:
+        """Every location with all of its ``reviews(review_content, rating)``."""
+
+    @abstractmethod
+    async def list_review_texts(self) -> list[dict]:
+        """``location_id`` and ``review_content`` of every review with text, by review id."""
+
+    @abstractmethod
+    async def list_location_keys(self) -> list[dict]:
+        """``location_id, source_key, name, lat, long, place_id, cid, fid`` of every location, by id."""
+
+    @abstractmethod
+    async def list_data_versions(self, after: int) -> list[dict]:
+        """``scope, version`` of every data version newer than ``after``.
+
+        The database moves these on every write (``sql/007_data_version.sql``).
+        """
+
+    # ── Writes ──
+
+    @abstractmethod
+    async def upsert_locations(self, rows: list[dict]) -> dict[str, int]:
+        """Insert or update locations by ``source_key``; ``{source_key: location_id}`` for every row.
+
+        Source keys must be distinct within one call.
+        """
+
+    @abstractmethod
+    async def upsert_reviews(self, rows: list[dict]) -> list[dict]:
+        """Insert reviews, or update the stored review with the same ``source_review_id``.
+
+        Returns ``location_id`` of the rows written; the SQL backend leaves out
+        reviews stored already with the same content.
+        """
+
+    @abstractmethod
+    async def replace_images(self, rows: list[dict]) -> list[dict]:
+        """Make ``rows`` the images of the locations they name, dropping their other images.
+
+        Returns ``location_id`` of the rows written; the SQL backend leaves out
+        images stored already.
+        """
+
+    @abstractmethod
+    async def upsert_risk_report(self, row: dict) -> bool:
+        """Replace the location's report, or insert it; True if one was replaced.
+
+        Reports are matched on ``row["location_id"]``, or on ``business_name``
+        when the location is unknown.
+        """
+
+    async def aclose(self) -> None:
+        pass
+
+
+class SupabaseRepository(Repository):
+    """Repository over PostgREST, using the async Supabase client."""
+
+    def __init__(self, client, http: Optional[httpx.AsyncClient] = None):
+        self.client = client
+        self._http = http
+
+    @classmethod
+    async def connect(
+        cls, url: str = SUPABASE_URL, key: str = SUPABASE_KEY,
+        max_connections: int = MAX_CONNECTIONS, timeout: float = TIMEOUT,
+    ) -> "SupabaseRepository":
+        from supabase import acreate_client
+        from supabase.lib.client_options import AsyncClientOptions
+
+        http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+        )
+        client = await acreate_client(
+            url, key, options=AsyncClientOptions(httpx_client=http, postgrest_client_timeout=timeout)
+        )
+        return cls(client, http)
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+
+    def _table(self, name: str):
+        return self.client.table(name)
+
+    async def _fetch_all(self, build, order: str = "location_id") -> list[dict]:
+        """Page ``build()`` past PostgREST's row cap, ordered by the unique column ``order``."""
+        rows = []
+        start = 0
+        while True:
+            page = (await build().order(order).range(start, start + PAGE_SIZE - 1).execute()).data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+            start += PAGE_SIZE
+
+    async def list_locations(self) -> list[dict]:
+        return await self._fetch_all(lambda: self._table("locations").select(
+            "location_id, name, lat, long, addr, category,"
+            " location_images(image_url), risk_reports(risk_score),"
+            " location_rating_stats(review_count, rating_count, rating_sum),"
+            " location_keyword_counts(keyword, review_count)"
+        ))
+
+    async def get_locations(self, ids: list[int], reviews: int = 0) -> list[dict]:
+        columns = (
+            "location_id, name, lat, long, addr,"
+            " location_images(id, name, image_url),"
+            " location_rating_stats(review_count, rating_count, rating_sum,"
+            " rating_1, rating_2, rating_3, rating_4, rating_5),"
+            " risk_reports(id, business_name, summary, risk_score, risk_reason)"
+        )
+        if reviews:
+            columns += ", reviews(review_id, review_content, rating)"
+        query = self._table("locations").select(columns).in_("location_id", ids)
+        if reviews:
+            query = (
+                query
+                .order("review_id", desc=True, foreign_table="reviews")
+                .limit(reviews, foreign_table="reviews")
+            )
+        return (await query.execute()).data or []
+
+    async def list_reviews(
+        self, location_id: int, sort: ReviewSort, after: Optional[tuple], size: int
+    ) -> list[dict]:
+        query = (
+            self._table("reviews")
+            .select("review_id, review_content, rating")
+            .eq("location_id", location_id)
+        )
+        if sort == "recent":
+            if after is not None:
+                query = query.lt("review_id", after[1])
+        else:
+            desc = sort == "rating_desc"
+            if after is not None:
+                rating, review_id = after
+                if rating is None:
+                    query = query.is_("rating", "null").lt("review_id", review_id)
+                else:
+                    beyond = "lt" if desc else "gt"
+                    query = query.or_(
+                        f"rating.{beyond}.{rating},"
+                        f"and(rating.eq.{rating},review_id.lt.{review_id}),"
+                        f"rating.is.null"
+                    )
+            query = query.order("rating", desc=desc, nullsfirst=False)
+        return (await query.order("review_id", desc=True).limit(size).execute()).data or []
+
+    async def get_risk_report(self, location_id: int) -> Optional[dict]:
+        rows = (await (
+            self._table("risk_reports")
+            .select("id, business_name, summary, risk_score, risk_reason")
+            .eq("location_id", location_id)
+            .execute()
+        )).data
+        return rows[0] if rows else None
+
+    async def list_locations_with_reviews(self) -> list[dict]:
+        return await self._fetch_all(lambda: self._table("locations").select(
+            "location_id, name, lat, long, addr, reviews(review_content, rating)"
+        ))
+
+    async def list_review_texts(self) -> list[dict]:
+        return await self._fetch_all(
+            lambda: self._table("reviews").select("location_id, review_content").neq("review_content", ""),
+            order="review_id",
+        )
+
+    async def list_location_keys(self) -> list[dict]:
+        return await self._fetch_all(lambda: self._table("locations").select(
+            "location_id, source_key, name, lat, long, place_id, cid, fid"
+        ))
+
+    async def list_data_versions(self, after: int) -> list[dict]:
+        return await self._fetch_all(
+            lambda: self._table("data_version").select("scope, version").gt("version", after),
+            order="scope",
+        )
+
+    async def _upsert(self, table: str, rows: list[dict], on_conflict: str, ignore_duplicates: bool) -> list[dict]:
+        """Upsert ``rows`` in chunks; the rows written come back, with their generated ids."""
+        written = []
+        for start in range(0, len(rows), WRITE_CHUNK):
+            written.extend((await (
+                self._table(table)
+                .upsert(rows[start:start + WRITE_CHUNK], on_conflict=on_conflict, ignore_duplicates=ignore_duplicates)
+                .execute()
+            )).data or [])
+        return written
+
+    async def upsert_locations(self, rows: list[dict]) -> dict[str, int]:
+        written = await self._upsert("locations", rows, "source_key", ignore_duplicates=False)
+        return {row["source_key"]: row["location_id"] for row in written}
+
+    async def upsert_reviews(self, rows: list[dict]) -> list[dict]:
+        return await self._upsert("reviews", rows, "source_review_id", ignore_duplicates=False)
+
+    async def replace_images(self, rows: list[dict]) -> list[dict]:
+        # Dropped first and re-sent, so a retry after a partial failure converges.
+        ids = sorted({row["location_id"] for row in rows})
+        for start in range(0, len(ids), ID_CHUNK):
+            await self._table("location_images").delete().in_("location_id", ids[start:start + ID_CHUNK]).execute()
+        return await self._upsert("location_images", rows, "location_id,image_url", ignore_duplicates=True)
+
+    async def upsert_risk_report(self, row: dict) -> bool:
+        query = self._table("risk_reports").select("id")
+        if row.get("location_id") is not None:
+            query = query.eq("location_id", row["location_id"])
+        else:
+            query = query.eq("business_name", row["business_name"])
+        existing = (await query.order("id").limit(1).execute()).data
+        if existing:
+            # Without a location, keep whatever location the report already has
+            update = {k: v for k, v in row.items() if not (k == "location_id" and v is None)}
+            await self._table("risk_reports").update(update).eq("id", existing[0]["id"]).execute()
+            return True
+        await self._table("risk_reports").insert(row).execute()
+        return False
+
+
+# json_agg of a correlated subquery, '[]' when it has no rows.
+def _embed(select: str, order: str) -> str:
+    return f"coalesce((select json_agg(t order by {order}) from ({select}) t), '[]')"
+
+
+_IMAGES = _embed("select id, name, image_url from location_images where location_id = l.location_id", "t.id")
+_RISK_REPORTS = _embed(
+    "select id, business_name, summary, risk_score, risk_reason"
+    " from risk_reports where location_id = l.location_id",
+    "t.id",
+)
+_STATS = (
+    "(select row_to_json(t) from (select review_count, rating_count, rating_sum,"
+    " rating_1, rating_2, rating_3, rating_4, rating_5"
+    " from location_rating_stats where location_id = l.location_id) t)"
+)
+
+_LIST_LOCATIONS = f"""
+select l.location_id, l.name, l.lat, l.long, l.addr, l.category,
+       {_embed("select id, image_url from location_images where location_id = l.location_id", "t.id")}
+           as location_images,
+       {_embed("select id, risk_score from risk_reports where location_id = l.location_id", "t.id")}
+           as risk_reports,
+       (select row_to_json(t) from (select review_count, rating_count, rating_sum
+            from location_rating_stats where location_id = l.location_id) t) as location_rating_stats,
+       {_embed("select keyword, review_count from location_keyword_counts where location_id = l.location_id",
+               "t.keyword")} as location_keyword_counts
+from locations l
+order by l.location_id
+"""
+
+_GET_LOCATIONS = f"""
+select l.location_id, l.name, l.lat, l.long, l.addr,
+       {_IMAGES} as location_images,
+       {_STATS} as location_rating_stats,
+       {_RISK_REPORTS} as risk_reports
+       {{reviews}}
+from locations l
+where l.location_id = any(:ids)
+"""
+
+_LOCATION_REVIEWS = ", " + _embed(
+    "select review_id, review_content, rating from reviews"
+    " where location_id = l.location_id order by review_id desc limit :reviews",
+    "t.review_id desc",
+) + " as reviews"
+
+_LIST_LOCATIONS_WITH_REVIEWS = f"""
+select l.location_id, l.name, l.lat, l.long, l.addr,
+       {_embed("select review_id, review_content, rating from reviews where location_id = l.location_id",
+               "t.review_id")} as reviews
+from locations l
+order by l.location_id
+"""
+
+# Bulk writes take their rows as one JSON array, so a chunk is one statement
+# and ``returning`` hands back the generated ids.
+_UPSERT_LOCATIONS = """
+insert into locations (source_key, name, lat, long, addr, category, place_id, cid, fid)
+select * from json_to_recordset(cast(:rows as json))
+    as r (source_key text, name text, lat double precision, long double precision, addr text, category text,
+          place_id text, cid text, fid text)
+on conflict (source_key) do update set
+    name = excluded.name, lat = excluded.lat, long = excluded.long, addr = excluded.addr,
+    category = excluded.category, place_id = excluded.place_id, cid = excluded.cid, fid = excluded.fid
+returning location_id, source_key
+"""
+
+# Unchanged reviews are left alone, so re-sending a batch writes nothing.
+_UPSERT_REVIEWS = """
+insert into reviews (location_id, review_content, rating, source_review_id)
+select * from json_to_recordset(cast(:rows as json))
+    as r (location_id bigint, review_content text, rating integer, source_review_id text)
+on conflict (source_review_id) do update set
+    location_id = excluded.location_id, review_content = excluded.review_content, rating = excluded.rating
+where (reviews.location_id, reviews.review_content, reviews.rating)
+    is distinct from (excluded.location_id, excluded.review_content, excluded.rating)
+returning location_id
+"""
+
+# Every location's rows must be in the same chunk: the others are deleted.
+_REPLACE_IMAGES = """
+with new as (
+    select * from json_to_recordset(cast(:rows as json)) as r (location_id bigint, name text, image_url text)
+), deleted as (
+    delete from location_images i
+    where i.location_id in (select location_id from new)
+      and not exists (select 1 from new where new.location_id = i.location_id and new.image_url = i.image_url)
+)
+insert into location_images (location_id, name, image_url)
+select location_id, name, image_url from new
+on conflict (location_id, image_url) do update set name = excluded.name
+where location_images.name is distinct from excluded.name
+returning location_id
+"""
+
+
+class SqlRepository(Repository):
+    """Repository over a direct Postgres connection pool.
+
+    Unless an ``engine`` is given, builds one on the ``app.core.config``
+    database with a pool of ``max_connections`` (``app.core.db``'s engine keeps
+    SQLAlchemy's default of 5 plus 10 overflow).  Queries run on a thread pool
+    of the same size, so neither queues behind the other.
+    """
+
+    def __init__(self, engine=None, max_connections: int = MAX_CONNECTIONS, timeout: float = TIMEOUT):
+        if engine is None:
+            from sqlalchemy import create_engine
+            from app.core.config import settings
+
+            engine = create_engine(
+                str(settings.SQLALCHEMY_DATABASE_URI),
+                pool_size=max_connections, max_overflow=0, pool_timeout=timeout,
+            )
+        self.engine = engine
+        self._executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="sql-repository")
+
+    async def aclose(self) -> None:
+        await self._call(self.engine.dispose)
+        self._executor.shutdown(wait=False)
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _run(self, sql: str, params: Any, returns: bool = True) -> list[dict]:
+        from sqlalchemy import text
+
+        with self.engine.begin() as conn:
+            result = conn.execute(text(sql), params)
+            if not returns:
+                return []
+            # numeric columns come back as Decimal; PostgREST serves them as JSON numbers.
+            return [
+                {k: float(v) if isinstance(v, Decimal) else v for k, v in row.items()}
+                for row in result.mappings()
+            ]
+
+    async def _query(self, sql: str, **params: Any) -> list[dict]:
+        return await self._call(self._run, sql, params)
+
+    async def _exec(self, sql: str, **params: Any) -> None:
+        await self._call(self._run, sql, params, False)
+
+    async def list_locations(self) -> list[dict]:
+        return await self._query(_LIST_LOCATIONS)
+
+    async def get_locations(self, ids: list[int], reviews: int = 0) -> list[dict]:
+        if not reviews:
+            return await self._query(_GET_LOCATIONS.format(reviews=""), ids=list(ids))
+        return await self._query(_GET_LOCATIONS.format(reviews=_LOCATION_REVIEWS), ids=list(ids), reviews=reviews)
+
+    async def list_reviews(
+        self, location_id: int, sort: ReviewSort, after: Optional[tuple], size: int
+    ) -> list[dict]:
+        where = ["location_id = :location_id"]
+        params: dict[str, Any] = {"location_id": location_id, "size": size}
+        if sort == "recent":
+            order = "review_id desc"
+            if after is not None:
+                where.append("review_id < :after_id")
+                params["after_id"] = after[1]
+        else:
+            desc = sort == "rating_desc"
+            order = f"rating {'desc' if desc else 'asc'} nulls last, review_id desc"
+            if after is not None:
+                rating = after[0]
+                params["after_id"] = after[1]
+                if rating is None:
+                    where.append("rating is null and review_id < :after_id")
+                else:
+                    params["after_rating"] = rating
+                    where.append(
+                        f"(rating {'<' if desc else '>'} :after_rating"
+                        " or (rating = :after_rating and review_id < :after_id)"
+                        " or rating is null)"
+                    )
+        return await self._query(
+            "select review_id, review_content, rating from reviews"
+            f" where {' and '.join(where)} order by {order} limit :size",
+            **params,
+        )
+
+    async def get_risk_report(self, location_id: int) -> Optional[dict]:
+        rows = await self._query(
+            "select id, business_name, summary, risk_score, risk_reason from risk_reports"
+            " where location_id = :location_id order by id limit 1",
+            location_id=location_id,
+        )
+        return rows[0] if rows else None
+
+    async def list_locations_with_reviews(self) -> list[dict]:
+        return await self._query(_LIST_LOCATIONS_WITH_REVIEWS)
+
+    async def list_review_texts(self) -> list[dict]:
+        return await self._query(
+            "select location_id, review_content from reviews where review_content <> '' order by review_id"
+        )
+
+    async def list_location_keys(self) -> list[dict]:
+        return await self._query(
+            "select location_id, source_key, name, lat, long, place_id, cid, fid from locations order by location_id"
+        )
+
+    async def list_data_versions(self, after: int) -> list[dict]:
+        return await self._query("select scope, version from data_version where version > :after", after=after)
+
+    async def _write_chunks(self, sql: str, rows: list[dict]) -> list[dict]:
+        """Run ``sql`` once per chunk of ``rows``, passed as the JSON array ``:rows``."""
+        written = []
+        for start in range(0, len(rows), WRITE_CHUNK):
+            written.extend(await self._query(sql, rows=json.dumps(rows[start:start + WRITE_CHUNK])))
+        return written
+
+    async def upsert_locations(self, rows: list[dict]) -> dict[str, int]:
+        written = await self._write_chunks(_UPSERT_LOCATIONS, rows)
+        return {row["source_key"]: row["location_id"] for row in written}
+
+    async def upsert_reviews(self, rows: list[dict]) -> list[dict]:
+        return await self._write_chunks(_UPSERT_REVIEWS, rows)
+
+    async def replace_images(self, rows: list[dict]) -> list[dict]:
+        # Chunk on location boundaries, so no chunk deletes another's images.
+        by_location: dict[int, list[dict]] = {}
+        for row in rows:
+            by_location.setdefault(row["location_id"], []).append(row)
+        written, chunk = [], []
+        for location_rows in by_location.values():
+            if chunk and len(chunk) + len(location_rows) > WRITE_CHUNK:
+                written.extend(await self._query(_REPLACE_IMAGES, rows=json.dumps(chunk)))
+                chunk = []
+            chunk.extend(location_rows)
+        if chunk:
+            written.extend(await self._query(_REPLACE_IMAGES, rows=json.dumps(chunk)))
+        return written
+
+    async def upsert_risk_report(self, row: dict) -> bool:
+        rows = await self._query(
+            "with updated as ("
+            "  update risk_reports set business_name = :business_name, summary = :summary,"
+            "  risk_score = :risk_score, risk_reason = :risk_reason"
+            "  where id = (select id from risk_reports where case when cast(:location_id as bigint) is null"
+            "    then business_name = :business_name else location_id = :location_id end order by id limit 1)"
+            "  returning id"
+            "), inserted as ("
+            "  insert into risk_reports (location_id, business_name, summary, risk_score, risk_reason)"
+            "  select :location_id, :business_name, :summary, :risk_score, :risk_reason"
+            "  where not exists (select 1 from updated)"
+            "  returning id"
+            ") select exists (select 1 from updated) as replaced",
+            **row,
+        )
+        return rows[0]["replaced"]
+
+
+async def create_repository(backend: str = REPOSITORY_BACKEND) -> Repository:
+    """Open the configured repository backend; close it with ``aclose``."""
+    if backend == "supabase":
+        return await SupabaseRepository.connect()
+    if backend == "sql":
+        return SqlRepository()
+    raise ValueError(f"Unknown repository backend {backend!r}; expected 'supabase' or 'sql'")
@@ -0,0 +1,113 @@
+"""Versioned in-process cache of encoded API responses.
+
+Entries are stored with the data version (see ``invalidation``) they were
+built from and are only served while that version is still current, so a
+write to the database retires them in every worker at once.  Each
+body carries a strong ETag so clients can revalidate with If-None-Match and
+get a 304 without the body being sent again.  Compressed variants are made
+on first request and kept on the entry, so each body is compressed once per
+encoding rather than on every response.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+import orjson
+from fastapi import Request, Response
+
+from compression import MINIMUM_SIZE, SUPPORTED, compress, negotiate, variant_etag
+
+MAX_ENTRIES = 2048
+
+
+def _etag_matches(header: Optional[str], etags: set[str]) -> bool:
+    """Weak comparison of an If-None-Match header against our ETags (RFC 9110 13.1.2)."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") in etags for tag in header.split(","))
+
+
+class CachedResponse:
+    __slots__ = ("version", "status_code", "body", "headers", "etag", "variants")
+
+    def __init__(self, version: int, status_code: int, body: bytes, headers: Optional[dict[str, str]] = None):
+        self.version = version
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        # Compressed bodies by content coding, filled in lazily.
+        self.variants: dict[str, bytes] = {}
+
+    def encoded(self, encoding: str) -> bytes:
+        body = self.variants.get(encoding)
+        if body is None:
+            body = self.variants[encoding] = compress(self.body, encoding)
+        return body
+
+    def to_response(self, request: Request, headers: Optional[dict[str, str]] = None) -> Response:
+        """Build the HTTP response, answering 304 when the client already has this body.
+
+        The body is sent compressed when the client accepts an encoding and it
+        is large enough to be worth it.
+        """
+        headers = {**self.headers, **(headers or {})}
+        encoding = None
+        if len(self.body) >= MINIMUM_SIZE:
+            headers["Vary"] = "Accept-Encoding"
+            encoding = negotiate(request.headers.get("accept-encoding"))
+            if encoding is not None:
+                headers["Content-Encoding"] = encoding
+        if self.status_code == 200:
+            headers["ETag"] = variant_etag(self.etag, encoding) if encoding else self.etag
+            # Let clients keep the body but revalidate it on every use.
+            headers["Cache-Control"] = "no-cache"
+            # Any variant's ETag revalidates: they all carry the same content.
+            etags = {self.etag, *(variant_etag(self.etag, e) for e in SUPPORTED)}
+            if _etag_matches(request.headers.get("if-none-match"), etags):
+                return Response(status_code=304, headers=headers)
+        body = self.encoded(encoding) if encoding else self.body
+        return Response(
+            content=body,
+            status_code=self.status_code,
+            media_type="application/json",
+            headers=headers,
+        )
+
+
+class ResponseCache:
+    """LRU of encoded responses keyed by caller-chosen keys, valid for one data version."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, CachedResponse] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: int) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.version != version:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(
+        self, key: Hashable, version: int, content: Any,
+        status_code: int = 200, headers: Optional[dict[str, str]] = None,
+    ) -> CachedResponse:
+        """Encode ``content`` as JSON and store it, with any extra response headers, for ``version``."""
+        body = orjson.dumps(content)
+        entry = CachedResponse(version, status_code, body, headers)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
@@ -0,0 +1,200 @@
+"""In-memory full-text search over location names, addresses and reviews.
+
+Each location is one document with three fields.  Field term frequencies are
+weighted and scored with BM25F, so a name hit outranks the same word buried in
+a review.  Postings are NumPy arrays per term, so a query scores every
+matching location in a few vectorized passes.  All query terms must match
+(the last one as a prefix, for search-as-you-type).
+
+Like the cluster index, the search index is rebuilt from the location index's
+records when it refreshes, with review text loaded through the repository;
+refreshes at an unchanged data version (the periodic ones) keep it as is,
+since reloading every review text is the expensive part.
+"""
+
+import bisect
+import logging
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from typing import Callable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Relative weight of a term occurrence in each field.
+FIELD_WEIGHTS = {"name": 3.0, "addr": 1.0, "reviews": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Longest prefix expansion for the last query term.
+MAX_PREFIX_TERMS = 50
+# Characters of review text around the first match in a highlight.
+SNIPPET_CHARS = 160
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+@lru_cache(maxsize=1 << 16)
+def _fold(token: str) -> str:
+    """Accent-free, crudely singular form of a lower-case token."""
+    if not token.isascii():
+        token = unicodedata.normalize("NFKD", token)
+        token = "".join(c for c in token if not unicodedata.combining(c))
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        token = token[:-1]
+    return token
+
+
+def tokenize(text: Optional[str]) -> list[tuple[str, int, int]]:
+    """``(term, start, end)`` of each word in ``text``; offsets index the original string."""
+    if not text:
+        return []
+    return [(_fold(m.group()), m.start(), m.end()) for m in _TOKEN_RE.finditer(text.lower())]
+
+
+def _snippet(text: str, spans: list[tuple[int, int]]) -> tuple[str, list[list[int]]]:
+    """Window of ``text`` around the first span, with spans rebased onto it."""
+    if len(text) <= SNIPPET_CHARS:
+        return text, [list(s) for s in spans]
+    start = max(0, min(spans[0][0] - SNIPPET_CHARS // 4, len(text) - SNIPPET_CHARS))
+    if start:
+        # Begin on a word boundary rather than mid-word.
+        space = text.find(" ", start, spans[0][0])
+        start = space + 1 if space >= 0 else spans[0][0]
+    end = start + SNIPPET_CHARS
+    return text[start:end], [[s - start, e - start] for s, e in spans if s >= start and e <= end]
+
+
+class _Snapshot:
+    __slots__ = ("records", "reviews", "terms", "postings", "doc_len", "avg_len", "loaded_at")
+
+    def __init__(self, records: list[dict], reviews: dict[int, list[str]]):
+        self.records = records
+        self.reviews = [reviews.get(r["id"], []) for r in records]
+
+        tf: dict[str, dict[int, float]] = defaultdict(lambda: defaultdict(float))
+        doc_len = np.zeros(len(records), dtype=np.float64)
+        for i, rec in enumerate(records):
+            fields = (("name", [rec.get("name")]), ("addr", [rec.get("addr")]), ("reviews", self.reviews[i]))
+            for field, texts in fields:
+                weight = FIELD_WEIGHTS[field]
+                for text in texts:
+                    for term, _, _ in tokenize(text):
+                        tf[term][i] += weight
+                        doc_len[i] += weight
+
+        self.terms = sorted(tf)
+        self.postings = {
+            term: (np.fromiter(docs.keys(), dtype=np.int64, count=len(docs)),
+                   np.fromiter(docs.values(), dtype=np.float64, count=len(docs)))
+            for term, docs in tf.items()
+        }
+        self.doc_len = doc_len
+        self.avg_len = float(doc_len.mean()) if len(records) else 0.0
+        self.loaded_at = time.time()
+
+    def expand(self, term: str, prefix: bool) -> list[str]:
+        if not prefix:
+            return [term] if term in self.postings else []
+        lo = bisect.bisect_left(self.terms, term)
+        hi = bisect.bisect_left(self.terms, term + "\uffff")
+        return self.terms[lo:min(hi, lo + MAX_PREFIX_TERMS)]
+
+
+class SearchIndex:
+    """BM25F inverted index over locations, rebuilt with the location index.
+
+    ``review_loader`` returns ``{location_id: [review text, ...]}`` and is
+    called on every rebuild.  With ``version_source``, a rebuild at the data
+    version the index was last built at is skipped.
+    """
+
+    def __init__(self, review_loader: Callable[[], dict[int, list[str]]],
+                 version_source: Optional[Callable[[], int]] = None):
+        self._review_loader = review_loader
+        self._version_source = version_source
+        self._version: Optional[int] = None
+        self._snapshot: Optional[_Snapshot] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._snapshot is not None
+
+    def rebuild(self, records: list[dict]) -> None:
+        version = self._version_source() if self._version_source else None
+        if version is not None and version == self._version and self._snapshot is not None:
+            return
+        started = time.perf_counter()
+        self._snapshot = _Snapshot(records, self._review_loader())
+        self._version = version
+        logger.info("Search index built over %d locations in %.0f ms",
+                    len(records), (time.perf_counter() - started) * 1000)
+
+    def search(self, query: str, limit: int = 20) -> list[dict]:
+        """Best ``limit`` locations for ``query``, highest score first.
+
+        Each result is the location record plus ``score`` and ``highlights``:
+        ``{"field", "text", "matches"}`` where ``matches`` are ``[start, end)``
+        character ranges of matched words in ``text``.
+        """
+        snap = self._snapshot
+        words = [term for term, _, _ in tokenize(query)]
+        if snap is None or not words or not snap.records:
+            return []
+
+        n = len(snap.records)
+        scores = np.zeros(n, dtype=np.float64)
+        matched = np.ones(n, dtype=bool)
+        all_terms: set[str] = set()
+        # A trailing space means the last word is complete.
+        last_is_prefix = not query[-1:].isspace()
+
+        for pos, word in enumerate(words):
+            terms = snap.expand(word, prefix=last_is_prefix and pos == len(words) - 1)
+            hit = np.zeros(n, dtype=bool)
+            for term in terms:
+                docs, tf = snap.postings[term]
+                idf = np.log1p((n - len(docs) + 0.5) / (len(docs) + 0.5))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * snap.doc_len[docs] / snap.avg_len)
+                scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+                hit[docs] = True
+            matched &= hit
+            all_terms.update(terms)
+
+        idx = np.flatnonzero(matched)
+        top = idx[np.argsort(-scores[idx], kind="stable")[:limit]]
+        return [
+            {**snap.records[i], "score": round(float(scores[i]), 3),
+             "highlights": self._highlights(snap, i, words, all_terms)}
+            for i in top.tolist()
+        ]
+
+    @staticmethod
+    def _highlights(snap: _Snapshot, i: int, words: list[str], terms: set[str]) -> list[dict]:
+        rec = snap.records[i]
+        out = []
+        for field in ("name", "addr"):
+            text = rec.get(field)
+            spans = [[s, e] for term, s, e in tokenize(text) if term in terms]
+            if spans:
+                out.append({"field": field, "text": text, "matches": spans})
+
+        # The review containing the most distinct query words, then the most
+        # often; substring counts are only a cheap proxy for choosing it.
+        best, best_key = None, (0, 0)
+        for text in snap.reviews[i]:
+            lowered = text.lower()
+            counts = [lowered.count(w) for w in words]
+            key = (sum(1 for c in counts if c), sum(counts))
+            if key > best_key:
+                best, best_key = text, key
+        if best is not None:
+            spans = [(s, e) for term, s, e in tokenize(best) if term in terms]
+            if spans:
+                text, matches = _snippet(best, spans)
+                out.append({"field": "review", "text": text, "matches": matches})
+        return out
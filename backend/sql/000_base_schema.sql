@@ -0,0 +1,39 @@
+-- Tables behind the map API, as they exist in the Supabase project.
+--
+-- Apply this (then the numbered migrations) to a plain Postgres database to
+-- run the API, Json2DB.py or agenticReviewer.py against it with
+-- REPOSITORY_BACKEND=sql; see repository.py.
+
+create table if not exists public.locations (
+    location_id bigint generated by default as identity primary key,
+    name        text not null,
+    lat         double precision,
+    long        double precision,
+    addr        text
+);
+
+create table if not exists public.location_images (
+    id          bigint generated by default as identity primary key,
+    location_id bigint references public.locations (location_id) on delete cascade,
+    name        text,
+    image_url   text
+);
+create index if not exists location_images_location_id on public.location_images (location_id);
+
+create table if not exists public.reviews (
+    review_id      bigint generated by default as identity primary key,
+    location_id    bigint references public.locations (location_id) on delete cascade,
+    review_content text,
+    rating         integer
+);
+create index if not exists reviews_location_id on public.reviews (location_id, review_id desc);
+
+create table if not exists public.risk_reports (
+    id            bigint generated by default as identity primary key,
+    location_id   bigint references public.locations (location_id) on delete set null,
+    business_name text,
+    summary       text,
+    risk_score    numeric,
+    risk_reason   text
+);
+create index if not exists risk_reports_location_id on public.risk_reports (location_id);
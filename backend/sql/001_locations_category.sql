@@ -0,0 +1,3 @@
+-- Category of each location ("club", "liquor", "smoke"), taken from the
+-- extraction file it was ingested from. Served as a map tile property.
+alter table public.locations add column if not exists category text;
@@ -0,0 +1,116 @@
+-- Per-location review aggregates, so list queries read two numbers per
+-- location instead of embedding every review.
+--
+-- Maintained incrementally by statement-level triggers on public.reviews, so
+-- Json2DB.py and any other writer keep it current without extra round trips;
+-- a bulk insert costs one upsert per touched location, not one per review.
+
+create table if not exists public.location_rating_stats (
+    location_id  bigint primary key references public.locations (location_id) on delete cascade,
+    review_count integer not null default 0,  -- all reviews, rated or not
+    rating_count integer not null default 0,  -- reviews with a rating
+    rating_sum   numeric not null default 0,
+    rating_1     integer not null default 0,  -- histogram by rounded star rating
+    rating_2     integer not null default 0,
+    rating_3     integer not null default 0,
+    rating_4     integer not null default 0,
+    rating_5     integer not null default 0
+);
+
+create or replace function public.location_rating_stats_apply() returns trigger
+language plpgsql as $$
+begin
+    if tg_op in ('INSERT', 'UPDATE') then
+        insert into public.location_rating_stats as s
+            (location_id, review_count, rating_count, rating_sum,
+             rating_1, rating_2, rating_3, rating_4, rating_5)
+        select location_id, count(*), count(rating), coalesce(sum(rating), 0),
+               count(*) filter (where round(rating) = 1),
+               count(*) filter (where round(rating) = 2),
+               count(*) filter (where round(rating) = 3),
+               count(*) filter (where round(rating) = 4),
+               count(*) filter (where round(rating) = 5)
+        from new_rows
+        where location_id is not null
+        group by location_id
+        on conflict (location_id) do update set
+            review_count = s.review_count + excluded.review_count,
+            rating_count = s.rating_count + excluded.rating_count,
+            rating_sum   = s.rating_sum   + excluded.rating_sum,
+            rating_1     = s.rating_1     + excluded.rating_1,
+            rating_2     = s.rating_2     + excluded.rating_2,
+            rating_3     = s.rating_3     + excluded.rating_3,
+            rating_4     = s.rating_4     + excluded.rating_4,
+            rating_5     = s.rating_5     + excluded.rating_5;
+    end if;
+
+    if tg_op in ('DELETE', 'UPDATE') then
+        update public.location_rating_stats as s set
+            review_count = s.review_count - d.review_count,
+            rating_count = s.rating_count - d.rating_count,
+            rating_sum   = s.rating_sum   - d.rating_sum,
+            rating_1     = s.rating_1     - d.rating_1,
+            rating_2     = s.rating_2     - d.rating_2,
+            rating_3     = s.rating_3     - d.rating_3,
+            rating_4     = s.rating_4     - d.rating_4,
+            rating_5     = s.rating_5     - d.rating_5
+        from (
+            select location_id, count(*) as review_count, count(rating) as rating_count,
+                   coalesce(sum(rating), 0) as rating_sum,
+                   count(*) filter (where round(rating) = 1) as rating_1,
+                   count(*) filter (where round(rating) = 2) as rating_2,
+                   count(*) filter (where round(rating) = 3) as rating_3,
+                   count(*) filter (where round(rating) = 4) as rating_4,
+                   count(*) filter (where round(rating) = 5) as rating_5
+            from old_rows
+            where location_id is not null
+            group by location_id
+        ) d
+        where s.location_id = d.location_id;
+    end if;
+
+    return null;
+end;
+$$;
+
+-- Transition tables allow only one event per trigger.
+drop trigger if exists reviews_rating_stats_insert on public.reviews;
+create trigger reviews_rating_stats_insert
+    after insert on public.reviews
+    referencing new table as new_rows
+    for each statement execute function public.location_rating_stats_apply();
+
+drop trigger if exists reviews_rating_stats_update on public.reviews;
+create trigger reviews_rating_stats_update
+    after update on public.reviews
+    referencing old table as old_rows new table as new_rows
+    for each statement execute function public.location_rating_stats_apply();
+
+drop trigger if exists reviews_rating_stats_delete on public.reviews;
+create trigger reviews_rating_stats_delete
+    after delete on public.reviews
+    referencing old table as old_rows
+    for each statement execute function public.location_rating_stats_apply();
+
+-- Backfill from the reviews already loaded.
+insert into public.location_rating_stats
+    (location_id, review_count, rating_count, rating_sum,
+     rating_1, rating_2, rating_3, rating_4, rating_5)
+select location_id, count(*), count(rating), coalesce(sum(rating), 0),
+       count(*) filter (where round(rating) = 1),
+       count(*) filter (where round(rating) = 2),
+       count(*) filter (where round(rating) = 3),
+       count(*) filter (where round(rating) = 4),
+       count(*) filter (where round(rating) = 5)
+from public.reviews
+where location_id is not null
+group by location_id
+on conflict (location_id) do update set
+    review_count = excluded.review_count,
+    rating_count = excluded.rating_count,
+    rating_sum   = excluded.rating_sum,
+    rating_1     = excluded.rating_1,
+    rating_2     = excluded.rating_2,
+    rating_3     = excluded.rating_3,
+    rating_4     = excluded.rating_4,
+    rating_5     = excluded.rating_5;
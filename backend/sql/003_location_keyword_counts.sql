@@ -0,0 +1,33 @@
+-- Per-location keyword facets: how many of a location's reviews mention each
+-- keyword in keywords.KEYWORDS.
+--
+-- Json2DB.py adds to these counts as it inserts reviews, so the API can filter
+-- on a keyword without reading review text. The backfill below covers reviews
+-- loaded before this table existed; its keyword list is a snapshot of
+-- keywords.KEYWORDS and its pattern mirrors keywords.KeywordMatcher, with
+-- keywords.EXCLUDED_WORDS in the lookahead.
+
+create table if not exists public.location_keyword_counts (
+    location_id  bigint not null references public.locations (location_id) on delete cascade,
+    keyword      text not null,
+    review_count integer not null default 0,
+    primary key (location_id, keyword)
+);
+
+create index if not exists location_keyword_counts_keyword
+    on public.location_keyword_counts (keyword, review_count desc);
+
+insert into public.location_keyword_counts (location_id, keyword, review_count)
+select r.location_id, k.keyword, count(*)
+from public.reviews r
+join (values
+    ('hookah'), ('shisha'), ('cigar'), ('pipe'), ('tobacco'),
+    ('vape'), ('e-liquid'), ('disposable'), ('rolling papers'),
+    ('glass'), ('bong'), ('grinder'), ('kratom'), ('cbd'),
+    ('friendly'), ('selection'), ('price'), ('cheap'), ('expensive'),
+    ('discount'), ('quality'), ('service'), ('recommend')
+) as k (keyword)
+    on r.review_content ~* ('\m(?!pipeline|bongo)' || k.keyword)
+where r.location_id is not null
+group by r.location_id, k.keyword
+on conflict (location_id, keyword) do update set review_count = excluded.review_count;
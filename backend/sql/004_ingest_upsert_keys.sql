@@ -0,0 +1,23 @@
+-- Unique keys that Json2DB.py upserts on, so it can write whole chunks of rows
+-- per request and get the generated location_ids back from the same call.
+--
+--   locations       name: one location per name, as Json2DB.py always assumed.
+--   reviews         source_review_id: the scraper's review_id, so reloading a
+--                   dump skips reviews that are already stored.
+--   location_images (location_id, image_url): no image is stored twice.
+--
+-- Reviews loaded before this migration have no source_review_id, so the first
+-- reload of their dump stores them once more. The unique index on
+-- locations (name) fails to build if duplicate names exist already; merge
+-- those by hand first.
+
+create unique index if not exists locations_name_key on public.locations (name);
+
+alter table public.reviews add column if not exists source_review_id text;
+create unique index if not exists reviews_source_review_id_key on public.reviews (source_review_id);
+
+delete from public.location_images a
+using public.location_images b
+where a.location_id = b.location_id and a.image_url = b.image_url and a.id > b.id;
+create unique index if not exists location_images_location_id_image_url_key
+    on public.location_images (location_id, image_url);
@@ -0,0 +1,30 @@
+-- Source ids of each location, so branches of a chain are separate locations.
+--
+-- Json2DB.py matches extraction records to locations with places.PlaceIndex
+-- (by place_id, cid or fid, else by name and distance) and upserts on
+-- source_key: the place_id of a new location, or the key of the location it
+-- matched. Locations loaded before this migration keep their name as their
+-- source_key, so they are updated in place rather than loaded twice, and pick
+-- up their ids on the next ingest.
+
+alter table public.locations
+    add column if not exists place_id   text,
+    add column if not exists cid        text,
+    add column if not exists fid        text,
+    add column if not exists source_key text;
+
+update public.locations set source_key = name where source_key is null;
+alter table public.locations alter column source_key set not null;
+
+create unique index if not exists locations_source_key_key on public.locations (source_key);
+create unique index if not exists locations_place_id_key on public.locations (place_id);
+
+-- Names no longer identify a location.
+drop index if exists public.locations_name_key;
+
+-- One risk report per location, so branches of a chain keep their own;
+-- agenticReviewer.py matches reports on location_id. Older duplicates go.
+delete from public.risk_reports a
+using public.risk_reports b
+where a.location_id = b.location_id and a.id < b.id;
+create unique index if not exists risk_reports_location_id_key on public.risk_reports (location_id);
@@ -0,0 +1,88 @@
+-- Keep location_keyword_counts current with statement-level triggers on
+-- public.reviews, the way 002 keeps location_rating_stats.
+--
+-- Json2DB.py used to add to these counts itself after each insert. When the
+-- insert had committed but its reply was lost, the retry inserted nothing and
+-- returned nothing, so those reviews were never counted; re-sending counts
+-- instead would double them. Counting in the same statement as the insert
+-- makes a retried or repeated insert add exactly what it stored.
+--
+-- public.review_keywords is a snapshot of keywords.KEYWORDS (lower-cased) and
+-- the pattern mirrors keywords.KeywordMatcher: a word starting with the
+-- keyword, unless it starts with one of keywords.EXCLUDED_WORDS. Change both.
+
+create table if not exists public.review_keywords (
+    keyword text primary key
+);
+
+insert into public.review_keywords (keyword) values
+    ('hookah'), ('shisha'), ('cigar'), ('pipe'), ('tobacco'),
+    ('vape'), ('e-liquid'), ('disposable'), ('rolling papers'),
+    ('glass'), ('bong'), ('grinder'), ('kratom'), ('cbd'),
+    ('friendly'), ('selection'), ('price'), ('cheap'), ('expensive'),
+    ('discount'), ('quality'), ('service'), ('recommend')
+on conflict (keyword) do nothing;
+
+create or replace function public.location_keyword_counts_apply() returns trigger
+language plpgsql as $$
+begin
+    if tg_op in ('INSERT', 'UPDATE') then
+        insert into public.location_keyword_counts as c (location_id, keyword, review_count)
+        select r.location_id, k.keyword, count(*)
+        from new_rows r
+        join public.review_keywords k
+            on r.review_content ~* ('\m(?!pipeline|bongo)' || k.keyword)
+        where r.location_id is not null
+        group by r.location_id, k.keyword
+        on conflict (location_id, keyword) do update set
+            review_count = c.review_count + excluded.review_count;
+    end if;
+
+    if tg_op in ('DELETE', 'UPDATE') then
+        update public.location_keyword_counts as c set
+            review_count = c.review_count - d.review_count
+        from (
+            select r.location_id, k.keyword, count(*) as review_count
+            from old_rows r
+            join public.review_keywords k
+                on r.review_content ~* ('\m(?!pipeline|bongo)' || k.keyword)
+            where r.location_id is not null
+            group by r.location_id, k.keyword
+        ) d
+        where c.location_id = d.location_id and c.keyword = d.keyword;
+    end if;
+
+    return null;
+end;
+$$;
+
+-- Transition tables allow only one event per trigger.
+drop trigger if exists reviews_keyword_counts_insert on public.reviews;
+create trigger reviews_keyword_counts_insert
+    after insert on public.reviews
+    referencing new table as new_rows
+    for each statement execute function public.location_keyword_counts_apply();
+
+drop trigger if exists reviews_keyword_counts_update on public.reviews;
+create trigger reviews_keyword_counts_update
+    after update on public.reviews
+    referencing old table as old_rows new table as new_rows
+    for each statement execute function public.location_keyword_counts_apply();
+
+drop trigger if exists reviews_keyword_counts_delete on public.reviews;
+create trigger reviews_keyword_counts_delete
+    after delete on public.reviews
+    referencing old table as old_rows
+    for each statement execute function public.location_keyword_counts_apply();
+
+-- Recount from the reviews already loaded, dropping anything a retried
+-- ingest counted twice.
+delete from public.location_keyword_counts;
+
+insert into public.location_keyword_counts (location_id, keyword, review_count)
+select r.location_id, k.keyword, count(*)
+from public.reviews r
+join public.review_keywords k
+    on r.review_content ~* ('\m(?!pipeline|bongo)' || k.keyword)
+where r.location_id is not null
+group by r.location_id, k.keyword;
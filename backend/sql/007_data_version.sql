@@ -0,0 +1,90 @@
+-- Data versions for the API's caches, moved by the database on every write.
+--
+-- The API workers keep location snapshots, tiles, search indexes and encoded
+-- responses, and rebuild them when these versions move (see invalidation.py).
+-- Bumping them from statement-level triggers covers every writer, wherever it
+-- runs: Json2DB.py, agenticReviewer.py and edits made in the Supabase console.
+--
+-- 'global' moves once per statement that changed rows. Each location changed
+-- by that statement gets a 'location:<id>' row stamped with the new global
+-- version, so a worker only has to read the rows newer than the version it
+-- already has.
+
+create table if not exists public.data_version (
+    scope   text primary key,  -- 'global' or 'location:<location_id>'
+    version bigint not null
+);
+
+insert into public.data_version (scope, version) values ('global', 0)
+on conflict (scope) do nothing;
+
+create index if not exists data_version_version_idx on public.data_version (version);
+
+create or replace function public.data_version_bump() returns trigger
+language plpgsql as $$
+declare
+    stamp bigint;
+begin
+    -- Statement triggers fire even when no row matched.
+    if tg_op = 'DELETE' then
+        if not exists (select 1 from old_rows) then
+            return null;
+        end if;
+    elsif not exists (select 1 from new_rows) then
+        return null;
+    end if;
+
+    -- The row lock also orders concurrent writers' stamps by commit.
+    update public.data_version set version = version + 1
+    where scope = 'global'
+    returning version into stamp;
+
+    if tg_op in ('INSERT', 'UPDATE') then
+        insert into public.data_version (scope, version)
+        select distinct 'location:' || location_id, stamp
+        from new_rows
+        where location_id is not null
+        on conflict (scope) do update set version = excluded.version;
+    end if;
+
+    if tg_op in ('DELETE', 'UPDATE') then
+        insert into public.data_version (scope, version)
+        select distinct 'location:' || location_id, stamp
+        from old_rows
+        where location_id is not null
+        on conflict (scope) do update set version = excluded.version;
+    end if;
+
+    return null;
+end;
+$$;
+
+-- Transition tables allow only one event per trigger.
+do $$
+declare
+    t text;
+begin
+    foreach t in array array['locations', 'reviews', 'location_images', 'risk_reports'] loop
+        execute format('drop trigger if exists %I on public.%I', t || '_data_version_insert', t);
+        execute format(
+            'create trigger %I after insert on public.%I'
+            ' referencing new table as new_rows'
+            ' for each statement execute function public.data_version_bump()',
+            t || '_data_version_insert', t);
+
+        execute format('drop trigger if exists %I on public.%I', t || '_data_version_update', t);
+        execute format(
+            'create trigger %I after update on public.%I'
+            ' referencing old table as old_rows new table as new_rows'
+            ' for each statement execute function public.data_version_bump()',
+            t || '_data_version_update', t);
+
+        execute format('drop trigger if exists %I on public.%I', t || '_data_version_delete', t);
+        execute format(
+            'create trigger %I after delete on public.%I'
+            ' referencing old table as old_rows'
+            ' for each statement execute function public.data_version_bump()',
+            t || '_data_version_delete', t);
+    end loop;
+end;
+$$;
@@ -0,0 +1,19 @@
+import os
+import tempfile
+
+import pytest
+
+# Keep the caches main and the ingest modules open at import out of backend/.cache.
+_cache_dir = tempfile.mkdtemp(prefix="sin-maps-tests-")
+for name, file in (
+    ("INGEST_MANIFEST_PATH", "ingest_manifest.sqlite3"),
+    ("GEOCODE_CACHE_PATH", "geocode.sqlite3"),
+    ("TILE_CACHE_DIR", "tiles"),
+):
+    os.environ.setdefault(name, os.path.join(_cache_dir, file))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def db() -> None:
+    # These tests need no database; shadows the app's fixture that opens one.
+    return None
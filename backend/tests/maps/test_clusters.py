@@ -0,0 +1,73 @@
+import orjson
+
+from clusters import MAX_ZOOM, ClusterIndex
+
+WORLD = (-90, -180, 90, 180)
+
+
+def _records() -> list[dict]:
+    # Twenty locations in Las Vegas, plus outliers on the far edges of the map.
+    vegas = [
+        {"id": i, "lat": 36.1 + i * 1e-4, "lng": -115.1, "rating": 4.0, "reviewCount": 2}
+        for i in range(1, 21)
+    ]
+    edges = [
+        {"id": 21, "lat": 85.0, "lng": 179.9, "rating": None, "reviewCount": 0},
+        {"id": 22, "lat": -85.0, "lng": -179.9, "rating": 2.0, "reviewCount": 1},
+        {"id": 23, "lat": 90.0, "lng": 0.0, "rating": None, "reviewCount": 0},
+        {"id": 24, "lat": -90.0, "lng": 0.0, "rating": None, "reviewCount": 0},
+    ]
+    return vegas + edges
+
+
+def _count(items: list[dict]) -> int:
+    return sum(item["count"] if item["type"] == "cluster" else 1 for item in items)
+
+
+def test_full_world_bbox_holds_every_location_at_every_zoom() -> None:
+    index = ClusterIndex()
+    index.rebuild(_records())
+    for zoom in range(0, MAX_ZOOM + 2):
+        assert _count(index.get_clusters(*WORLD, zoom)) == len(_records())
+
+
+def test_zoomed_out_world_merges_nearby_locations() -> None:
+    index = ClusterIndex()
+    index.rebuild(_records())
+    clusters = [c for c in index.get_clusters(*WORLD, 0) if c["type"] == "cluster"]
+    assert any(c["count"] >= 20 for c in clusters)
+    vegas = max(clusters, key=lambda c: c["count"])
+    assert abs(vegas["lat"] - 36.1) < 1 and abs(vegas["lng"] + 115.1) < 1
+    assert vegas["rating"] == 4.0
+
+
+def test_past_max_zoom_returns_lone_locations() -> None:
+    index = ClusterIndex()
+    index.rebuild(_records())
+    items = index.get_clusters(*WORLD, MAX_ZOOM + 1)
+    assert all(item["type"] == "location" for item in items)
+    assert sorted(item["id"] for item in items) == [r["id"] for r in _records()]
+
+
+def test_json_matches_dicts() -> None:
+    index = ClusterIndex()
+    index.rebuild(_records())
+    for zoom in (0, 8, MAX_ZOOM + 1):
+        assert orjson.loads(index.get_clusters_json(*WORLD, zoom)) == index.get_clusters(*WORLD, zoom)
+
+
+def test_empty_before_rebuild() -> None:
+    index = ClusterIndex()
+    assert index.get_clusters(*WORLD, 3) == []
+    assert index.get_clusters_json(*WORLD, 3) == b"[]"
+
+
+def test_rebuild_with_fewer_locations_serves_only_them() -> None:
+    index = ClusterIndex()
+    index.rebuild(_records())
+    before = index._snapshot
+    index.rebuild(_records()[:3])
+    # Levels, records and fragments are swapped together in one snapshot.
+    assert index._snapshot is not before
+    assert [item["id"] for item in index.get_clusters(*WORLD, MAX_ZOOM + 1)] == [1, 2, 3]
+    assert [item["id"] for item in orjson.loads(index.get_clusters_json(*WORLD, MAX_ZOOM + 1))] == [1, 2, 3]
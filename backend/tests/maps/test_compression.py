@@ -0,0 +1,141 @@
+import asyncio
+import gzip
+import zlib
+from typing import Optional
+
+import pytest
+
+from compression import SUPPORTED, CompressionMiddleware, compress, negotiate, variant_etag
+
+BIG = b'{"rows":[' + b",".join(b'{"id":%d}' % i for i in range(500)) + b"]}"
+
+needs_brotli = pytest.mark.skipif("br" not in SUPPORTED, reason="brotli is not installed")
+
+
+def _app(chunks: list[bytes], content_type: str = "application/json", status: int = 200,
+         headers: Optional[list[tuple[bytes, bytes]]] = None):
+    async def app(_scope, _receive, send) -> None:
+        raw = [(b"content-type", content_type.encode()), *(headers or [])]
+        if len(chunks) == 1:
+            raw.append((b"content-length", str(len(chunks[0])).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": raw})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+
+    return app
+
+
+def _call(app, accept_encoding: Optional[str] = "gzip") -> tuple[dict, list[dict]]:
+    """Run one request through the middleware; returns the start headers and body messages."""
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": headers}
+    messages: list[dict] = []
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b""}
+
+    async def send(message: dict) -> None:
+        messages.append(message)
+
+    asyncio.run(CompressionMiddleware(app)(scope, receive, send))
+    start, *bodies = messages
+    return {k.decode(): v.decode() for k, v in start["headers"]}, bodies
+
+
+# ── Negotiation ──
+
+def test_negotiate_without_header_is_identity() -> None:
+    assert negotiate(None) is None
+    assert negotiate("") is None
+    assert negotiate("identity") is None
+
+
+def test_negotiate_honours_q_values() -> None:
+    assert negotiate("gzip") == "gzip"
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("gzip;q=0, *;q=0.5") == ("br" if "br" in SUPPORTED else None)
+    assert negotiate("*") == SUPPORTED[0]
+    assert negotiate("deflate, compress") is None
+    # An unparsable weight counts as refused.
+    assert negotiate("gzip;q=high") is None
+
+
+@needs_brotli
+def test_negotiate_prefers_brotli_unless_weighted_lower() -> None:
+    assert negotiate("gzip, deflate, br") == "br"
+    assert negotiate("br;q=0.5, gzip") == "gzip"
+    assert negotiate("BR;q=1.0, gzip;q=0.9") == "br"
+
+
+def test_variant_etag_is_distinct_per_encoding() -> None:
+    assert variant_etag('"abc"', "gzip") == '"abc-gzip"'
+    assert variant_etag('"abc"', "br") == '"abc-br"'
+
+
+# ── Middleware ──
+
+def test_whole_body_is_compressed_in_one_message() -> None:
+    headers, bodies = _call(_app([BIG], headers=[(b"etag", b'"abc"')]))
+
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert headers["etag"] == '"abc-gzip"'
+    [body] = bodies
+    assert not body.get("more_body", False)
+    assert int(headers["content-length"]) == len(body["body"])
+    assert gzip.decompress(body["body"]) == BIG
+
+
+@needs_brotli
+def test_brotli_when_preferred() -> None:
+    import brotli
+
+    headers, [body] = _call(_app([BIG]), accept_encoding="gzip, br")
+    assert headers["content-encoding"] == "br"
+    assert brotli.decompress(body["body"]) == BIG
+
+
+def test_streamed_body_is_flushed_after_every_chunk() -> None:
+    rows = [b'{"id":%d,"name":"location %d"}\n' % (i, i) for i in range(5)]
+    headers, bodies = _call(_app(rows, content_type="application/x-ndjson"))
+
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+    assert len(bodies) == len(rows)
+    # Each row can be decoded as soon as its message arrives.
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for row, body in zip(rows, bodies):
+        assert decoder.decompress(body["body"]) == row
+    assert not bodies[-1]["more_body"]
+    assert decoder.eof
+
+
+def test_small_bodies_pass_through() -> None:
+    headers, [body] = _call(_app([b'{"id":1}']))
+    assert "content-encoding" not in headers
+    assert body["body"] == b'{"id":1}'
+
+
+@pytest.mark.parametrize(
+    ("body", "content_type", "status", "headers"),
+    [
+        (BIG, "image/png", 200, []),
+        (compress(BIG, "gzip"), "application/json", 200, [(b"content-encoding", b"gzip")]),
+        (b"", "application/json", 304, []),
+    ],
+    ids=["not compressible", "already encoded", "not modified"],
+)
+def test_responses_that_are_left_alone(
+    body: bytes, content_type: str, status: int, headers: list[tuple[bytes, bytes]]
+) -> None:
+    sent_headers, [sent] = _call(_app([body], content_type, status, headers))
+    # Only the already encoded response carries an encoding, its own.
+    assert sent_headers.get("content-encoding") == ("gzip" if headers else None)
+    assert "vary" not in sent_headers
+    assert sent["body"] == body
+
+
+def test_clients_without_accept_encoding_get_identity() -> None:
+    headers, [body] = _call(_app([BIG]), accept_encoding=None)
+    assert "content-encoding" not in headers
+    assert body["body"] == BIG
@@ -0,0 +1,58 @@
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from main import _BBOX_CURSOR, _RADIUS_CURSOR, _REVIEWS_CURSOR, _decode_cursor, _encode_cursor
+
+
+def _raw(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize(
+    ("key", "shape"),
+    [
+        ([1.25, 7], _RADIUS_CURSOR),
+        ([0, 7], _RADIUS_CURSOR),
+        ([42], _BBOX_CURSOR),
+        ([4, 9], _REVIEWS_CURSOR),
+        ([None, 9], _REVIEWS_CURSOR),
+    ],
+)
+def test_round_trip(key: list, shape: tuple) -> None:
+    assert _decode_cursor(_encode_cursor(key), shape) == key
+
+
+@pytest.mark.parametrize(
+    ("cursor", "shape"),
+    [
+        (_encode_cursor([None, 5]), _RADIUS_CURSOR),
+        (_encode_cursor([1.5, None]), _RADIUS_CURSOR),
+        (_encode_cursor([1.5, 2.5]), _RADIUS_CURSOR),
+        (_encode_cursor([1.5]), _RADIUS_CURSOR),
+        (_raw("[NaN, 1]"), _RADIUS_CURSOR),
+        (_encode_cursor([None]), _BBOX_CURSOR),
+        (_encode_cursor([True]), _BBOX_CURSOR),
+        (_encode_cursor([1.0]), _BBOX_CURSOR),
+        (_encode_cursor(["1"]), _BBOX_CURSOR),
+        (_encode_cursor([1, 2]), _BBOX_CURSOR),
+        (_encode_cursor([None, None]), _REVIEWS_CURSOR),
+        (_encode_cursor(["4", 9]), _REVIEWS_CURSOR),
+        (_encode_cursor({"id": 1}), _BBOX_CURSOR),
+        (_raw("[1"), _BBOX_CURSOR),
+        ("not base64!", _BBOX_CURSOR),
+        ("", _BBOX_CURSOR),
+    ],
+)
+def test_rejects_bad_cursors(cursor: str, shape: tuple) -> None:
+    with pytest.raises(HTTPException) as exc:
+        _decode_cursor(cursor, shape)
+    assert exc.value.status_code == 422
+
+
+def test_encoding_is_compact_and_unpadded() -> None:
+    cursor = _encode_cursor([0.5, 12])
+    assert "=" not in cursor
+    assert json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))) == [0.5, 12]
@@ -0,0 +1,164 @@
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+import httpx
+import pytest
+
+from geocode import Coords, GeocodeBusy, GeocodeCache, Geocoder, RateLimiter, normalize_address
+
+
+def test_normalize_address_drops_case_punctuation_and_units() -> None:
+    key = normalize_address("123 Main St.")
+    assert key == "123 main st"
+    assert normalize_address("  123  MAIN st ") == key
+    assert normalize_address("123 Main St., Apt 4B") == key
+    assert normalize_address("123 Main St Suite 200") == key
+    assert normalize_address("123 Main St #12") == key
+    # Only unit designators go; the street number and words stay.
+    assert normalize_address("124 Main St") != key
+    assert normalize_address("123 Maine St") != key
+
+
+def test_cache_hit_and_miss(tmp_path: Path) -> None:
+    cache = GeocodeCache(str(tmp_path / "geocode.sqlite3"))
+
+    assert cache.get("123 main st") == (False, None)
+    cache.set("123 main st", (36.1, -115.2))
+    assert cache.get("123 main st") == (True, (36.1, -115.2))
+
+
+def test_negative_entries_are_hits_without_coords(tmp_path: Path) -> None:
+    cache = GeocodeCache(str(tmp_path / "geocode.sqlite3"))
+
+    cache.set("nowhere", None)
+    assert cache.get("nowhere") == (True, None)
+
+
+def test_found_and_not_found_expire_on_their_own_ttl(tmp_path: Path) -> None:
+    path = str(tmp_path / "geocode.sqlite3")
+    GeocodeCache(path).set("found", (36.1, -115.2))
+    GeocodeCache(path).set("missing", None)
+
+    positive_expired = GeocodeCache(path, ttl=-1, negative_ttl=3600)
+    assert positive_expired.get("found") == (False, None)
+    assert positive_expired.get("missing") == (True, None)
+    # The expired entry is gone, not just hidden.
+    assert GeocodeCache(path).get("found") == (False, None)
+
+    negative_expired = GeocodeCache(path, ttl=3600, negative_ttl=-1)
+    assert negative_expired.get("missing") == (False, None)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path: Path) -> None:
+    cache = GeocodeCache(str(tmp_path / "geocode.sqlite3"), max_entries=2)
+
+    cache.set("a", (1.0, 1.0))
+    cache.set("b", (2.0, 2.0))
+    assert cache.get("a")[0]  # a is now more recent than b
+    cache.set("c", (3.0, 3.0))
+
+    assert cache.get("a")[0]
+    assert cache.get("b") == (False, None)
+    assert cache.get("c")[0]
+
+
+def test_entries_are_shared_between_instances(tmp_path: Path) -> None:
+    path = str(tmp_path / "geocode.sqlite3")
+    GeocodeCache(path).set("123 main st", (36.1, -115.2))
+    # Another worker opening the same file sees the entry.
+    assert GeocodeCache(path).get("123 main st") == (True, (36.1, -115.2))
+
+
+class _NoLimit:
+    def reserve(self) -> float:
+        return 0.0
+
+
+class _Busy:
+    def reserve(self) -> float:
+        raise GeocodeBusy(3.0)
+
+
+def _geocoder(tmp_path: Path, limiter, handler) -> Geocoder:
+    geocoder = Geocoder(GeocodeCache(str(tmp_path / "geocode.sqlite3")), limiter, url="https://geocode.test/search")
+    geocoder._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return geocoder
+
+
+def test_concurrent_lookups_of_one_address_share_an_upstream_call(tmp_path: Path) -> None:
+    calls: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.params["q"])
+        await asyncio.sleep(0.05)  # long enough for every caller to join
+        return httpx.Response(200, json=[{"lat": "36.1", "lon": "-115.2"}])
+
+    async def run() -> list[Optional[Coords]]:
+        geocoder = _geocoder(tmp_path, _NoLimit(), handler)
+        try:
+            first = await asyncio.gather(
+                geocoder.geocode("123 Main St"),
+                geocoder.geocode("123 main st."),
+                geocoder.geocode("123 Main St, Apt 4"),
+            )
+            # Later lookups are served from the cache.
+            return [*first, await geocoder.geocode("123 MAIN ST")]
+        finally:
+            await geocoder.aclose()
+
+    assert asyncio.run(run()) == [(36.1, -115.2)] * 4
+    # Whichever caller got there first made the one call.
+    assert len(calls) == 1
+
+
+def test_not_found_is_cached(tmp_path: Path) -> None:
+    calls = 0
+
+    def handler(_request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return httpx.Response(200, json=[])
+
+    async def run() -> list[Optional[Coords]]:
+        geocoder = _geocoder(tmp_path, _NoLimit(), handler)
+        try:
+            return [await geocoder.geocode("nowhere"), await geocoder.geocode("Nowhere")]
+        finally:
+            await geocoder.aclose()
+
+    assert asyncio.run(run()) == [None, None]
+    assert calls == 1
+
+
+def test_busy_lookups_are_shed_without_calling_upstream(tmp_path: Path) -> None:
+    def handler(_request: httpx.Request) -> httpx.Response:
+        raise AssertionError("upstream called while busy")
+
+    async def run() -> None:
+        geocoder = _geocoder(tmp_path, _Busy(), handler)
+        try:
+            await geocoder.geocode("123 Main St")
+        finally:
+            await geocoder.aclose()
+
+    with pytest.raises(GeocodeBusy) as exc:
+        asyncio.run(run())
+    assert exc.value.retry_after == 3.0
+    # Nothing was cached, so the next request tries again.
+    assert GeocodeCache(str(tmp_path / "geocode.sqlite3")).get("123 main st") == (False, None)
+
+
+def test_rate_limiter_spaces_slots_and_sheds_past_max_wait(tmp_path: Path) -> None:
+    path = str(tmp_path / "geocode.sqlite3")
+    limiter = RateLimiter(path, interval=2.0, max_wait=3.0)
+
+    assert limiter.reserve() == 0.0
+    assert 1.5 < limiter.reserve() <= 2.0
+    # The next slot is ~4 s away, past max_wait; another worker sees the same schedule.
+    with pytest.raises(GeocodeBusy) as exc:
+        RateLimiter(path, interval=2.0, max_wait=3.0).reserve()
+    assert 3.0 < exc.value.retry_after <= 4.0
+    # A shed caller does not take a slot.
+    with pytest.raises(GeocodeBusy):
+        limiter.reserve()
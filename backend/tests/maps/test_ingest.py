@@ -0,0 +1,191 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from ingest import Batch, PipelineStats, Throughput, is_transient, run_pipeline, with_retries
+
+
+class _APIError(Exception):
+    """Shaped like postgrest's APIError: the SQLSTATE or PGRST code as ``code``."""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.code = code
+
+
+class _DriverError(Exception):
+    def __init__(self, sqlstate: str):
+        super().__init__(sqlstate)
+        self.sqlstate = sqlstate
+
+
+def _status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://db.test/rest/v1/reviews")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+
+# ── is_transient ──
+
+@pytest.mark.parametrize(
+    "exc",
+    [
+        httpx.ConnectTimeout("timed out"),
+        httpx.RemoteProtocolError("disconnected"),
+        asyncio.TimeoutError(),
+        ConnectionResetError(),
+        _status_error(503),
+        _status_error(429),
+        _APIError("40001"),
+        _APIError("PGRST003"),
+        _APIError("08006"),
+        OperationalError("select 1", {}, _DriverError("40P01")),
+        OperationalError("select 1", {}, _DriverError("XX000"), connection_invalidated=True),
+    ],
+    ids=lambda exc: type(exc).__name__ + ":" + str(getattr(exc, "code", "")),
+)
+def test_transient_failures(exc: BaseException) -> None:
+    assert is_transient(exc)
+
+
+@pytest.mark.parametrize(
+    "exc",
+    [
+        ValueError("bad row"),
+        _status_error(400),
+        _status_error(409),
+        _APIError("23505"),  # unique violation
+        _APIError("PGRST204"),
+        OperationalError("select 1", {}, _DriverError("42P01")),
+    ],
+    ids=lambda exc: type(exc).__name__ + ":" + str(getattr(exc, "code", "")),
+)
+def test_permanent_failures(exc: BaseException) -> None:
+    assert not is_transient(exc)
+
+
+# ── with_retries ──
+
+def _flaky(failures: list[BaseException], result: str = "ok"):
+    calls = 0
+
+    async def call() -> str:
+        nonlocal calls
+        calls += 1
+        if failures:
+            raise failures.pop(0)
+        return result
+
+    return call, lambda: calls
+
+
+def test_transient_failures_are_retried_until_success() -> None:
+    call, calls = _flaky([httpx.ReadTimeout("slow"), _APIError("40001")])
+    stats = Throughput("written")
+
+    assert asyncio.run(with_retries(call, stats, base_delay=0)) == "ok"
+    assert calls() == 3
+    assert stats.retries == 2
+
+
+def test_permanent_failures_are_raised_at_once() -> None:
+    call, calls = _flaky([_APIError("23505")])
+
+    with pytest.raises(_APIError):
+        asyncio.run(with_retries(call, base_delay=0))
+    assert calls() == 1
+
+
+def test_the_last_transient_failure_is_raised() -> None:
+    call, calls = _flaky([httpx.ReadTimeout(str(i)) for i in range(5)])
+
+    with pytest.raises(httpx.ReadTimeout, match="2"):
+        asyncio.run(with_retries(call, attempts=3, base_delay=0))
+    assert calls() == 3
+
+
+# ── run_pipeline ──
+
+def _batches(n: int, size: int = 10) -> list[Batch]:
+    return [Batch(range(i * size, (i + 1) * size), i * size, (i + 1) * size) for i in range(n)]
+
+
+def test_every_resolved_batch_is_written() -> None:
+    written: list[int] = []
+
+    async def resolve(batch: list) -> list:
+        # Odd rows only; batches left empty are dropped before the writers.
+        return [x for x in batch if x % 2] if batch[0] < 50 else []
+
+    async def write(rows: list) -> int:
+        await asyncio.sleep(0)
+        written.extend(rows)
+        return len(rows)
+
+    stats = asyncio.run(run_pipeline(_batches(8), resolve, write))
+
+    assert sorted(written) == [x for x in range(50) if x % 2]
+    assert (stats.parsed.rows, stats.parsed.batches) == (80, 8)
+    assert (stats.resolved.rows, stats.resolved.batches) == (25, 5)
+    assert (stats.written.rows, stats.written.batches) == (25, 5)
+
+
+def test_writes_run_concurrently_up_to_the_writer_count() -> None:
+    in_flight = peak = 0
+
+    async def resolve(batch: list) -> list:
+        return batch
+
+    async def write(rows: list) -> int:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return len(rows)
+
+    stats = asyncio.run(run_pipeline(_batches(12), resolve, write, writers=3))
+    assert peak == 3
+    assert stats.written.rows == 120
+
+
+def test_a_failing_stage_cancels_the_others() -> None:
+    cancelled = 0
+
+    async def resolve(batch: list) -> list:
+        return batch
+
+    async def write(rows: list) -> int:
+        nonlocal cancelled
+        if rows[0] == 30:
+            raise RuntimeError("write failed")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled += 1
+            raise
+        return len(rows)
+
+    async def run() -> PipelineStats:
+        return await asyncio.wait_for(run_pipeline(_batches(20), resolve, write, writers=4), timeout=5)
+
+    with pytest.raises(RuntimeError, match="write failed"):
+        asyncio.run(run())
+    # The three writers still sleeping on earlier batches were cancelled, not awaited.
+    assert cancelled == 3
+
+
+def test_a_failing_source_is_raised() -> None:
+    def source():
+        yield from _batches(2)
+        raise ValueError("bad json")
+
+    async def resolve(batch: list) -> list:
+        return batch
+
+    async def write(rows: list) -> int:
+        return len(rows)
+
+    with pytest.raises(ValueError, match="bad json"):
+        asyncio.run(run_pipeline(source(), resolve, write))
@@ -0,0 +1,74 @@
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+
+from ingest_manifest import Checkpoint, Manifest, fingerprint
+
+
+@pytest.fixture
+def manifest(tmp_path: Path) -> Generator[Manifest, None, None]:
+    manifest = Manifest(str(tmp_path / "manifest.sqlite3"))
+    yield manifest
+    manifest.close()
+
+
+def test_out_of_order_batches_settle_in_order(manifest: Manifest) -> None:
+    checkpoint = Checkpoint(manifest, "reviews.json", "v1")
+
+    checkpoint.finish(200, 300)
+    checkpoint.finish(100, 200)
+    # Nothing before 100 has finished, so nothing is settled yet.
+    assert checkpoint.position == 0
+    assert manifest.checkpoint("reviews.json", "v1") == (0, False)
+
+    checkpoint.finish(0, 100)
+    assert checkpoint.position == 300
+    assert manifest.checkpoint("reviews.json", "v1") == (300, False)
+
+    assert checkpoint.complete(300)
+    assert manifest.checkpoint("reviews.json", "v1") == (300, True)
+
+
+def test_failed_batch_holds_the_checkpoint_before_it(manifest: Manifest) -> None:
+    checkpoint = Checkpoint(manifest, "reviews.json", "v1")
+
+    # The batch [100, 200) failed and never finishes.
+    for start, end in ((300, 350), (0, 100), (200, 300)):
+        checkpoint.finish(start, end)
+    assert checkpoint.position == 100
+
+    assert not checkpoint.complete(350)
+    assert manifest.checkpoint("reviews.json", "v1") == (100, False)
+
+    # The next run resumes at the failed batch.
+    position, complete = manifest.checkpoint("reviews.json", "v1")
+    resumed = Checkpoint(manifest, "reviews.json", "v1", position)
+    resumed.finish(100, 200)
+    resumed.finish(200, 350)
+    assert resumed.complete(350)
+    assert manifest.checkpoint("reviews.json", "v1") == (350, True)
+
+
+def test_failed_last_batch_is_not_complete(manifest: Manifest) -> None:
+    checkpoint = Checkpoint(manifest, "reviews.json", "v1")
+    checkpoint.finish(0, 100)
+    assert not checkpoint.complete(142)
+    assert manifest.checkpoint("reviews.json", "v1") == (100, False)
+
+
+def test_checkpoint_of_another_version_starts_over(manifest: Manifest) -> None:
+    manifest.set_checkpoint("reviews.json", "v1", 500, complete=True)
+    assert manifest.checkpoint("reviews.json", "v2") == (0, False)
+
+
+def test_changed_records(manifest: Manifest) -> None:
+    old, new = fingerprint({"a": 1, "b": 2}), fingerprint({"a": 1, "b": 3})
+    assert fingerprint({"b": 2, "a": 1}) == old
+    assert manifest.changed("out_club.json", "place-1", old)
+
+    manifest.record("out_club.json", [("place-1", old, 7)])
+    assert not manifest.changed("out_club.json", "place-1", old)
+    assert manifest.changed("out_club.json", "place-1", new)
+    assert manifest.changed("out_smoke.json", "place-1", old)
+    assert manifest.refs("out_club.json") == {"place-1": 7}
@@ -0,0 +1,60 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from json_stream import iter_json_array
+
+ELEMENTS = [
+    {"review_id": "r1", "rating": 5, "review_text": {"en": "Great hookah, friendly staff"}},
+    {"review_id": "r2", "rating": None, "review_text": {"en": "Prices with \"quotes\", commas, ] and [ brackets"}},
+    {"nested": {"list": [1, 2.5, -3e-7, {"deep": [True, False, None]}]}, "unicode": "café ☕"},
+    [],
+    {},
+    "a string, with a comma",
+    1234567890,
+    -0.125,
+    6.02e23,
+    0,
+    True,
+    False,
+    None,
+]
+CHUNK_SIZES = [1, 2, 3, 5, 7, 16, 64, 1 << 16]
+
+
+def _write(tmp_path: Path, text: str) -> str:
+    path = tmp_path / "data.json"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("indent", [None, 2])
+def test_elements_across_chunk_sizes(tmp_path: Path, chunk_size: int, indent: int) -> None:
+    path = _write(tmp_path, json.dumps(ELEMENTS, indent=indent, ensure_ascii=False))
+    assert list(iter_json_array(path, chunk_size)) == ELEMENTS
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_numbers_split_across_chunks(tmp_path: Path, chunk_size: int) -> None:
+    numbers = [1.5, -22.75, 1e5, 3.25e-8, 123456, -7, 0.0]
+    path = _write(tmp_path, json.dumps(numbers, separators=(",", ":")))
+    assert list(iter_json_array(path, chunk_size)) == numbers
+
+
+@pytest.mark.parametrize("text", ["[]", "  [ \n ]  ", "\n[\t]"])
+def test_empty_array(tmp_path: Path, text: str) -> None:
+    assert list(iter_json_array(_write(tmp_path, text), 1)) == []
+
+
+@pytest.mark.parametrize("text", ["", "{}", '"x"', "  1"])
+def test_rejects_non_arrays(tmp_path: Path, text: str) -> None:
+    with pytest.raises(ValueError):
+        list(iter_json_array(_write(tmp_path, text), 4))
+
+
+@pytest.mark.parametrize("text", ["[1 2]", '[{"a": 1}', "[1,", "[1.5,", '[{"a": }]'])
+def test_rejects_malformed_arrays(tmp_path: Path, text: str) -> None:
+    with pytest.raises(ValueError):
+        list(iter_json_array(_write(tmp_path, text), 3))
@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+from keywords import KEYWORDS, KeywordMatcher, matcher
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("Highly recommended!", ["recommend"]),
+        ("great cigarettes and cigars", ["cigar"]),
+        ("Best HOOKAH in town, hookahs everywhere", ["hookah"]),
+        ("Rolling papers, CBD and e-liquids", ["rolling papers", "cbd", "e-liquid"]),
+        ("Friendly staff, good prices", ["friendly", "price"]),
+        ("vapes and vaporizers", ["vape"]),
+        ("pipeline delays", []),
+        ("Bongo drums on the wall", []),
+        ("but the pipes were nice", ["pipe"]),
+        ("", []),
+    ],
+)
+def test_find(text: str, expected: list[str]) -> None:
+    assert matcher.find(text) == expected
+
+
+def test_matches_only_at_word_start() -> None:
+    # Stricter than a substring test: a keyword inside a word is not a mention.
+    assert matcher.find("overpriced") == []
+    assert matcher.find("Tobacconist") == ["tobacco"]
+
+
+def test_keywords_are_canonical_and_distinct() -> None:
+    assert matcher.find("CBD cbd Cbd") == ["cbd"]
+    assert set(matcher.keywords) == {kw.lower() for kw in KEYWORDS}
+
+
+def test_without_exclusions() -> None:
+    assert KeywordMatcher(["pipe"], excluded=()).find("pipeline") == ["pipe"]
+
+
+def test_scraper_keeps_substring_matches() -> None:
+    pytest.importorskip("selenium")
+    pytest.importorskip("webdriver_manager")
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "FuncFolder"))
+    from scraper import filter_reviews
+
+    reviews = [{"text": "Overpriced but highly recommended"}, {"text": "Nothing to see"}]
+    kept = filter_reviews(reviews, ["price", "recommend"])
+    assert [r["text"] for r in kept] == ["Overpriced but highly recommended"]
+    assert kept[0]["matched_keywords"] == "price, recommend"
@@ -0,0 +1,93 @@
+import orjson
+
+from location_index import LocationFilter, LocationIndex
+
+
+def _records() -> list[dict]:
+    # A 5x5 grid of locations 0.01 degrees apart around (36.1, -115.1).
+    return [
+        {
+            "id": i + 1,
+            "name": f"Shop {i + 1}",
+            "lat": 36.08 + (i // 5) * 0.01,
+            "lng": -115.12 + (i % 5) * 0.01,
+            "rating": 1 + i % 5,
+            "reviewCount": i,
+            "riskScore": 1 + i % 10,
+            "keywords": {"hookah": 1} if i % 3 == 0 else {},
+        }
+        for i in range(25)
+    ]
+
+
+def _index() -> LocationIndex:
+    index = LocationIndex(_records)
+    index.refresh()
+    return index
+
+
+def _page_bbox(index: LocationIndex, filters: LocationFilter, limit: int) -> list[int]:
+    ids, after_id = [], None
+    while True:
+        body, next_key = index.query_bbox_json(36, -116, 37, -114, filters, limit=limit, after_id=after_id)
+        page = [r["id"] for r in orjson.loads(body)]
+        assert len(page) <= limit
+        ids += page
+        if next_key is None:
+            return ids
+        assert next_key == [page[-1]]
+        after_id = next_key[0]
+
+
+def _page_radius(index: LocationIndex, filters: LocationFilter, limit: int) -> list[dict]:
+    rows, after = [], None
+    while True:
+        body, next_key = index.query_radius_json(36.1, -115.1, 5, filters, limit=limit, after=after)
+        page = orjson.loads(body)
+        assert len(page) <= limit
+        rows += page
+        if next_key is None:
+            return rows
+        assert next_key == [page[-1]["distanceMiles"], page[-1]["id"]]
+        after = tuple(next_key)
+
+
+def test_bbox_pages_cover_every_location_once() -> None:
+    index = _index()
+    expected = [r["id"] for r in index.query_bbox(36, -116, 37, -114)]
+    assert len(expected) == 25
+    for limit in (1, 4, 25, 100):
+        assert _page_bbox(index, LocationFilter(), limit) == sorted(expected)
+
+
+def test_bbox_pages_with_filters() -> None:
+    index = _index()
+    filters = LocationFilter(min_rating=3, keywords=("hookah",))
+    expected = sorted(r["id"] for r in _records() if r["rating"] >= 3 and r["keywords"])
+    assert expected
+    for limit in (1, 2, 100):
+        assert _page_bbox(index, filters, limit) == expected
+
+
+def test_radius_pages_are_nearest_first_without_gaps() -> None:
+    index = _index()
+    everything = index.query_radius(36.1, -115.1, 5)
+    for limit in (1, 3, 7, 100):
+        rows = _page_radius(index, LocationFilter(), limit)
+        assert [r["id"] for r in rows] == [r["id"] for r in everything]
+        assert [(r["distanceMiles"], r["id"]) for r in rows] == sorted((r["distanceMiles"], r["id"]) for r in rows)
+
+
+def test_radius_pages_with_filters() -> None:
+    index = _index()
+    filters = LocationFilter(max_risk=5, min_reviews=10)
+    expected = {r["id"] for r in _records() if r["riskScore"] <= 5 and r["reviewCount"] >= 10}
+    assert expected
+    for limit in (1, 2, 100):
+        assert {r["id"] for r in _page_radius(index, filters, limit)} == expected
+
+
+def test_unknown_keyword_matches_nothing() -> None:
+    body, next_key = _index().query_bbox_json(36, -116, 37, -114, LocationFilter(keywords=("nope",)))
+    assert orjson.loads(body) == []
+    assert next_key is None
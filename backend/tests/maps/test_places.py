@@ -0,0 +1,72 @@
+from places import PlaceIndex, fid_feature, normalize_name
+
+VEGAS = (36.1147, -115.1728)
+HENDERSON = (36.0395, -114.9817)
+
+
+def _index() -> PlaceIndex:
+    index = PlaceIndex()
+    index.add("kens", "Ken's SOS Liquors", *VEGAS, place_id="ChIJkens", cid="111")
+    index.add("smoke-vegas", "Smoke Shop & Vape", *VEGAS, fid="0xabc:0x1")
+    index.add("smoke-henderson", "Smoke Shop & Vape", *HENDERSON, fid="0xdef:0x2")
+    index.add("no-coords", "Desert Hookah Lounge")
+    return index
+
+
+def test_normalize_name() -> None:
+    assert normalize_name("The Kén's SOS Liquors, LLC") == "kens sos liquors"
+    assert normalize_name("Smoke & Vape") == "smoke and vape"
+    assert normalize_name(None) == ""
+
+
+def test_fid_feature() -> None:
+    assert fid_feature("0x80c8c4:0x1a2b") == "0x80c8c4"
+    assert fid_feature("0x0:0x1a2b") is None
+    assert fid_feature(None) is None
+
+
+def test_resolves_by_source_id_first() -> None:
+    index = _index()
+    assert index.resolve("Something else", place_id="ChIJkens") == "kens"
+    assert index.resolve(None, cid="111") == "kens"
+    # Review dumps carry only the feature part of the fid.
+    assert index.resolve("Smoke Shop", fid="0xdef") == "smoke-henderson"
+
+
+def test_chain_branches_resolve_by_location() -> None:
+    index = _index()
+    assert index.resolve("Smoke Shop & Vape", *VEGAS) == "smoke-vegas"
+    assert index.resolve("Smoke Shop & Vape", HENDERSON[0] + 0.001, HENDERSON[1]) == "smoke-henderson"
+    # Far from every branch.
+    assert index.resolve("Smoke Shop & Vape", 40.0, -100.0) is None
+
+
+def test_chain_name_alone_is_ambiguous() -> None:
+    assert _index().resolve("Smoke Shop & Vape") is None
+
+
+def test_fuzzy_names_nearby() -> None:
+    index = _index()
+    assert index.resolve("Kens SOS Liquor", VEGAS[0] + 0.0005, VEGAS[1]) == "kens"
+    assert index.resolve("Kens SOS Liquor") == "kens"
+    assert index.resolve("Ken's Liquor Barn", *VEGAS) is None
+
+
+def test_conflicting_ids_never_match_by_name() -> None:
+    index = _index()
+    assert index.resolve("Ken's SOS Liquors", *VEGAS, place_id="ChIJother") is None
+    assert index.resolve("Ken's SOS Liquors", cid="222") is None
+
+
+def test_places_without_coordinates_match_by_name() -> None:
+    index = _index()
+    assert index.resolve("Desert Hookah Lounge", *VEGAS) == "no-coords"
+    assert index.resolve("Desert Hookah Lounges") == "no-coords"
+
+
+def test_first_place_keeps_a_shared_id() -> None:
+    index = PlaceIndex()
+    index.add(1, "A", place_id="same")
+    index.add(2, "B", place_id="same")
+    assert index.resolve("B", place_id="same") == 1
+    assert len(index) == 2
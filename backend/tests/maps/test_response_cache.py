@@ -0,0 +1,148 @@
+import gzip
+from typing import Optional
+
+from starlette.requests import Request
+
+from compression import variant_etag
+from invalidation import DataVersions
+from response_cache import ResponseCache
+
+
+def _request(headers: Optional[dict[str, str]] = None) -> Request:
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+class _Versions:
+    """``Repository.list_data_versions`` over a dict the test edits."""
+
+    def __init__(self) -> None:
+        self.rows = {"global": 0}
+        self.afters: list[int] = []
+
+    def bump(self, *location_ids: int) -> None:
+        stamp = self.rows["global"] = self.rows["global"] + 1
+        for location_id in location_ids:
+            self.rows[f"location:{location_id}"] = stamp
+
+    def __call__(self, after: int) -> list[dict]:
+        self.afters.append(after)
+        return [{"scope": s, "version": v} for s, v in self.rows.items() if v > after]
+
+
+def test_entry_is_served_only_at_its_version() -> None:
+    cache = ResponseCache()
+    cache.put(("detail", 1), 3, {"id": 1})
+
+    assert cache.get(("detail", 1), 3).body == b'{"id":1}'
+    assert cache.get(("detail", 1), 4) is None
+    # A stale entry is dropped, not kept for the old version.
+    assert cache.get(("detail", 1), 3) is None
+
+
+def test_least_recently_used_entries_are_evicted() -> None:
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", 0, 1)
+    cache.put("b", 0, 2)
+    assert cache.get("a", 0) is not None
+    cache.put("c", 0, 3)
+
+    assert cache.get("a", 0) is not None
+    assert cache.get("b", 0) is None
+    assert cache.get("c", 0) is not None
+
+
+def test_response_carries_etag_and_no_cache() -> None:
+    entry = ResponseCache().put("a", 0, {"id": 1})
+    response = entry.to_response(_request())
+
+    assert response.status_code == 200
+    assert response.body == b'{"id":1}'
+    assert response.headers["etag"] == entry.etag
+    assert response.headers["cache-control"] == "no-cache"
+
+
+def test_matching_if_none_match_gets_304_without_body() -> None:
+    entry = ResponseCache().put("a", 0, {"id": 1})
+
+    for header in (entry.etag, f"W/{entry.etag}", f'"other", {entry.etag}', "*"):
+        response = entry.to_response(_request({"If-None-Match": header}))
+        assert response.status_code == 304, header
+        assert response.body == b""
+        assert response.headers["etag"] == entry.etag
+
+    response = entry.to_response(_request({"If-None-Match": '"other"'}))
+    assert response.status_code == 200
+    assert response.body == b'{"id":1}'
+
+
+def test_etag_follows_the_body() -> None:
+    cache = ResponseCache()
+    first = cache.put("a", 0, {"id": 1})
+    assert cache.put("b", 0, {"id": 1}).etag == first.etag
+    assert cache.put("a", 1, {"id": 2}).etag != first.etag
+
+
+def test_error_responses_carry_no_etag() -> None:
+    entry = ResponseCache().put("a", 0, {"detail": "Location not found"}, status_code=404)
+    response = entry.to_response(_request({"If-None-Match": "*"}))
+
+    assert response.status_code == 404
+    assert "etag" not in response.headers
+
+
+def test_data_versions_read_only_what_moved() -> None:
+    source = _Versions()
+    versions = DataVersions(source)
+
+    assert versions.refresh() == 0
+    source.bump(1, 2)
+    source.bump(2)
+    assert versions.refresh() == 2
+    assert source.afters == [-1, 0]
+
+    assert versions.get() == 2
+    assert versions.get(1) == 1
+    assert versions.get(2) == 2
+    # A location that never changed keeps version 0.
+    assert versions.get(3) == 0
+    # Nothing moved: the global version stays and no rows come back.
+    assert versions.refresh() == 2
+    assert source.afters[-1] == 2
+
+
+def test_bump_retires_only_the_changed_locations_entries() -> None:
+    source = _Versions()
+    versions = DataVersions(source)
+    versions.refresh()
+    cache = ResponseCache()
+    for location_id in (1, 2):
+        cache.put(("detail", location_id), versions.get(location_id), {"id": location_id})
+
+    source.bump(1)
+    versions.refresh()
+
+    assert cache.get(("detail", 1), versions.get(1)) is None
+    assert cache.get(("detail", 2), versions.get(2)) is not None
+
+
+def test_large_bodies_are_compressed_once_per_encoding() -> None:
+    entry = ResponseCache().put("a", 0, [{"id": i, "name": f"location {i}"} for i in range(200)])
+    request = _request({"Accept-Encoding": "gzip"})
+
+    first = entry.to_response(request)
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["vary"] == "Accept-Encoding"
+    assert first.headers["etag"] == variant_etag(entry.etag, "gzip")
+    assert gzip.decompress(first.body) == entry.body
+    # The second response reuses the stored variant.
+    assert entry.to_response(request).body is first.body
+
+
+def test_any_variant_etag_revalidates() -> None:
+    entry = ResponseCache().put("a", 0, [{"id": i, "name": f"location {i}"} for i in range(200)])
+
+    for etag in (entry.etag, variant_etag(entry.etag, "gzip")):
+        response = entry.to_response(_request({"Accept-Encoding": "gzip", "If-None-Match": etag}))
+        assert response.status_code == 304
+        assert response.headers["etag"] == variant_etag(entry.etag, "gzip")
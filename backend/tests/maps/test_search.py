@@ -0,0 +1,101 @@
+from search import SNIPPET_CHARS, SearchIndex, tokenize
+
+RECORDS = [
+    {"id": 1, "name": "Hookah Palace", "addr": "1 Fremont St, Las Vegas"},
+    {"id": 2, "name": "Smoke Shop", "addr": "2 Hookah Ave, Las Vegas"},
+    {"id": 3, "name": "Corner Liquor", "addr": "3 Main St, Henderson"},
+    {"id": 4, "name": "Café Cigars", "addr": "4 Main St, Henderson"},
+]
+REVIEWS = {
+    2: ["Good prices.", "Great hookah and friendly staff, would recommend"],
+    3: ["They also sell hookahs"],
+    4: ["Nice cigars"],
+}
+
+
+def _index(reviews: dict[int, list[str]] = REVIEWS) -> SearchIndex:
+    index = SearchIndex(lambda: reviews)
+    index.rebuild(RECORDS)
+    return index
+
+
+def _ids(results: list[dict]) -> list[int]:
+    return [r["id"] for r in results]
+
+
+def test_tokenize_folds_case_accents_and_plurals() -> None:
+    assert tokenize("Café CIGARS, glass") == [("cafe", 0, 4), ("cigar", 5, 11), ("glass", 13, 18)]
+    assert tokenize(None) == []
+
+
+def test_name_match_outranks_address_and_review_matches() -> None:
+    results = _index().search("hookah ")
+    assert _ids(results) == [1, 2, 3]
+    assert results[0]["score"] > results[1]["score"] > results[2]["score"]
+
+
+def test_every_query_word_must_match() -> None:
+    assert _ids(_index().search("hookah friendly ")) == [2]
+    assert _index().search("hookah nonsense ") == []
+
+
+def test_last_word_matches_as_a_prefix_until_completed() -> None:
+    assert sorted(_ids(_index().search("hend"))) == [3, 4]
+    assert _index().search("hend ") == []
+
+
+def test_accented_and_plural_queries_match() -> None:
+    assert _ids(_index().search("cafe ")) == [4]
+    assert _ids(_index().search("CIGAR ")) == [4]
+
+
+def test_results_carry_the_record_score_and_limit() -> None:
+    results = _index().search("las vegas ", limit=1)
+    assert len(results) == 1
+    assert {"id", "name", "addr", "score", "highlights"} <= results[0].keys()
+
+
+def test_highlights_mark_matched_words_per_field() -> None:
+    [result] = _index().search("fremont ")
+    assert result["highlights"] == [
+        {"field": "addr", "text": "1 Fremont St, Las Vegas", "matches": [[2, 9]]},
+    ]
+
+    [palace, shop, liquor] = _index().search("hookah ")
+    assert palace["highlights"] == [{"field": "name", "text": "Hookah Palace", "matches": [[0, 6]]}]
+    # The review mentioning the query words is chosen, not the first one.
+    assert shop["highlights"][-1] == {
+        "field": "review", "text": "Great hookah and friendly staff, would recommend", "matches": [[6, 12]],
+    }
+    assert liquor["highlights"] == [{"field": "review", "text": "They also sell hookahs", "matches": [[15, 22]]}]
+
+
+def test_long_reviews_are_cut_to_a_snippet_around_the_match() -> None:
+    review = "word " * 100 + "hookah lounge " + "word " * 100
+    [result] = _index({3: [review]}).search("lounge ")
+    highlight = result["highlights"][0]
+
+    assert highlight["field"] == "review"
+    assert len(highlight["text"]) <= SNIPPET_CHARS
+    [[start, end]] = highlight["matches"]
+    assert highlight["text"][start:end] == "lounge"
+    assert highlight["text"].startswith("word")
+
+
+def test_rebuild_is_skipped_at_an_unchanged_version() -> None:
+    version = 1
+    loads = []
+
+    def loader() -> dict[int, list[str]]:
+        loads.append(version)
+        return {}
+
+    index = SearchIndex(loader, version_source=lambda: version)
+    index.rebuild(RECORDS)
+    index.rebuild(RECORDS)
+    assert loads == [1]
+
+    version = 2
+    index.rebuild(RECORDS[:1])
+    assert loads == [1, 2]
+    assert _ids(index.search("main ")) == []
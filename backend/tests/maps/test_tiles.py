@@ -0,0 +1,150 @@
+import math
+import struct
+
+from tiles import BUFFER, EXTENT, LAYER_NAME, encode_tile, tile_bbox
+
+
+# ── Minimal Mapbox Vector Tile reader ──
+
+def _varint(data: bytes, pos: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def _fields(data: bytes) -> list[tuple[int, object]]:
+    fields, pos = [], 0
+    while pos < len(data):
+        key, pos = _varint(data, pos)
+        field, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = _varint(data, pos)
+        elif wire == 1:
+            value, pos = struct.unpack("<d", data[pos:pos + 8])[0], pos + 8
+        elif wire == 2:
+            size, pos = _varint(data, pos)
+            value, pos = data[pos:pos + size], pos + size
+        else:
+            raise AssertionError(f"unexpected wire type {wire}")
+        fields.append((field, value))
+    return fields
+
+
+def _packed(data: bytes) -> list[int]:
+    values, pos = [], 0
+    while pos < len(data):
+        value, pos = _varint(data, pos)
+        values.append(value)
+    return values
+
+
+def _unzigzag(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
+
+
+def _decode_value(data: bytes):
+    (field, value), = _fields(data)
+    return {1: lambda v: v.decode(), 3: float, 6: _unzigzag, 7: bool}[field](value)
+
+
+def _decode(tile: bytes) -> tuple[dict, list[dict]]:
+    (field, layer_bytes), = _fields(tile)
+    assert field == 3
+    layer: dict = {"features": [], "keys": [], "values": []}
+    for field, value in _fields(layer_bytes):
+        if field == 1:
+            layer["name"] = value.decode()
+        elif field == 2:
+            layer["features"].append(value)
+        elif field == 3:
+            layer["keys"].append(value.decode())
+        elif field == 4:
+            layer["values"].append(_decode_value(value))
+        else:
+            layer[{15: "version", 5: "extent"}[field]] = value
+
+    features = []
+    for data in layer["features"]:
+        feature = dict(_fields(data))
+        tags = _packed(feature[2])
+        command, dx, dy = _packed(feature[4])
+        assert feature[3] == 1 and command == 1 << 3 | 1
+        features.append({
+            "id": feature[1],
+            "properties": {layer["keys"][k]: layer["values"][v] for k, v in zip(tags[::2], tags[1::2])},
+            "point": (_unzigzag(dx), _unzigzag(dy)),
+        })
+    return layer, features
+
+
+def _unproject(px: int, py: int, z: int, x: int, y: int) -> tuple[float, float]:
+    n = 2 ** z
+    lng = (x + px / EXTENT) / n * 360 - 180
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + py / EXTENT) / n))))
+    return lat, lng
+
+
+# ── Tests ──
+
+RECORDS = [
+    {"id": 1, "name": "Ken's SOS Liquors", "lat": 36.1147, "lng": -115.1728, "rating": 4.5,
+     "riskScore": 7, "category": "liquor"},
+    {"id": 2, "name": "Café ☕ Hookah", "lat": 36.1201, "lng": -115.1650, "rating": None,
+     "riskScore": 2, "category": "smoke"},
+    {"id": 3, "name": "Ken's SOS Liquors", "lat": 36.1100, "lng": -115.1800, "rating": 4.5,
+     "riskScore": None, "category": "liquor"},
+    # Far outside the tile.
+    {"id": 4, "name": "Elsewhere", "lat": 40.7, "lng": -74.0, "rating": 3.0, "riskScore": 1, "category": "club"},
+]
+
+
+def _tile_of(lat: float, lng: float, z: int) -> tuple[int, int]:
+    n = 2 ** z
+    x = int((lng + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return x, y
+
+
+def test_round_trip() -> None:
+    z = 14
+    x, y = _tile_of(36.1147, -115.1728, z)
+    layer, features = _decode(encode_tile(RECORDS, z, x, y))
+
+    assert layer["name"] == LAYER_NAME
+    assert layer["version"] == 2
+    assert layer["extent"] == EXTENT
+    min_lat, min_lng, max_lat, max_lng = tile_bbox(z, x, y)
+    expected = [r for r in RECORDS if min_lat <= r["lat"] <= max_lat and min_lng <= r["lng"] <= max_lng]
+    assert [f["id"] for f in features] == [r["id"] for r in expected] == [1, 2, 3]
+
+    # A tile pixel at z14 is under a metre; allow one pixel of rounding.
+    pixel_deg = 360 / 2 ** z / EXTENT
+    for feature, record in zip(features, expected):
+        assert feature["properties"] == {
+            key: record[key] for key in ("name", "rating", "riskScore", "category") if record[key] is not None
+        }
+        px, py = feature["point"]
+        assert -BUFFER <= px <= EXTENT + BUFFER and -BUFFER <= py <= EXTENT + BUFFER
+        lat, lng = _unproject(px, py, z, x, y)
+        assert abs(lat - record["lat"]) < pixel_deg
+        assert abs(lng - record["lng"]) < pixel_deg
+
+    # Repeated keys and values are stored once.
+    assert len(layer["keys"]) == 4
+    assert len(layer["values"]) == len({(type(v), v) for v in layer["values"]})
+
+
+def test_world_tile_holds_every_location() -> None:
+    _, features = _decode(encode_tile(RECORDS, 0, 0, 0))
+    assert sorted(f["id"] for f in features) == [1, 2, 3, 4]
+
+
+def test_empty_tile_is_empty_bytes() -> None:
+    x, y = _tile_of(-33.9, 18.4, 12)
+    assert encode_tile(RECORDS, 12, x, y) == b""
+    assert encode_tile([], 0, 0, 0) == b""
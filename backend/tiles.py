@@ -0,0 +1,168 @@
+"""Mapbox Vector Tiles for the locations map layer.
+
+Tiles are cut from the in-process location index and encoded straight to the
+MVT protobuf (spec v2), so no GIS dependency is needed for a single point
+layer.  Encoded tiles are cached on disk under the data version they were
+built from, next to their compressed variants; a write moving that version
+makes the old directory unreachable and it is pruned on the next write.
+"""
+
+import math
+import os
+import shutil
+import struct
+import threading
+from typing import Optional
+
+TILE_CACHE_DIR = os.environ.get(
+    "TILE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "tiles"),
+)
+
+LAYER_NAME = "locations"
+EXTENT = 4096
+# Points this far outside the tile (in tile units) are still included so
+# markers straddling a tile edge are drawn on both sides.
+BUFFER = 64
+MAX_ZOOM = 22
+
+MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+
+def tile_bbox(z: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """Bounds of a tile plus its buffer as (min_lat, min_lng, max_lat, max_lng)."""
+    n = 2 ** z
+    b = BUFFER / EXTENT
+
+    def lat(ty: float) -> float:
+        ty = min(max(ty, 0), n)
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+
+    def lng(tx: float) -> float:
+        return min(max(tx / n * 360 - 180, -180.0), 180.0)
+
+    return lat(y + 1 + b), lng(x - b), lat(y - b), lng(x + 1 + b)
+
+
+def _tile_coords(lat: float, lng: float, z: int, x: int, y: int) -> tuple[int, int]:
+    n = 2 ** z
+    sin = min(max(math.sin(math.radians(lat)), -0.9999), 0.9999)
+    wx = (lng + 180) / 360 * n
+    wy = (0.5 - 0.25 * math.log((1 + sin) / (1 - sin)) / math.pi) * n
+    return round((wx - x) * EXTENT), round((wy - y) * EXTENT)
+
+
+# ── Protobuf primitives ──
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _field_varint(field: int, value: int) -> bytes:
+    return _varint(field << 3) + _varint(value)
+
+
+def _field_bytes(field: int, data: bytes) -> bytes:
+    return _varint(field << 3 | 2) + _varint(len(data)) + data
+
+
+def _packed(field: int, values: list[int]) -> bytes:
+    return _field_bytes(field, b"".join(_varint(v) for v in values))
+
+
+def _value(v) -> bytes:
+    # Tile.Value: 1 string, 3 double, 6 sint64, 7 bool
+    if isinstance(v, bool):
+        return _field_varint(7, int(v))
+    if isinstance(v, int):
+        return _field_varint(6, _zigzag(v))
+    if isinstance(v, float):
+        return _varint(3 << 3 | 1) + struct.pack("<d", v)
+    return _field_bytes(1, str(v).encode("utf-8"))
+
+
+def encode_tile(records: list[dict], z: int, x: int, y: int) -> bytes:
+    """Encode the records as one point layer; empty bytes when nothing falls in the tile."""
+    keys: dict[str, int] = {}
+    values: dict[tuple[type, object], int] = {}
+    features = []
+
+    for rec in records:
+        px, py = _tile_coords(rec["lat"], rec["lng"], z, x, y)
+        if not (-BUFFER <= px <= EXTENT + BUFFER and -BUFFER <= py <= EXTENT + BUFFER):
+            continue
+
+        tags = []
+        for key in ("name", "rating", "riskScore", "category"):
+            val = rec.get(key)
+            if val is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(val), val), len(values)))
+
+        # Feature: 1 id, 2 tags, 3 type (1 = POINT), 4 geometry (MoveTo x1)
+        features.append(
+            _field_varint(1, rec["id"])
+            + _packed(2, tags)
+            + _field_varint(3, 1)
+            + _packed(4, [1 << 3 | 1, _zigzag(px), _zigzag(py)])
+        )
+
+    if not features:
+        return b""
+
+    # Layer: 15 version, 1 name, 2 features, 3 keys, 4 values, 5 extent
+    layer = (
+        _field_varint(15, 2)
+        + _field_bytes(1, LAYER_NAME.encode("utf-8"))
+        + b"".join(_field_bytes(2, f) for f in features)
+        + b"".join(_field_bytes(3, k.encode("utf-8")) for k in keys)
+        + b"".join(_field_bytes(4, _value(v)) for (_, v) in values)
+        + _field_varint(5, EXTENT)
+    )
+    return _field_bytes(3, layer)
+
+
+class TileCache:
+    """On-disk tile store laid out as ``<dir>/<version>/<z>/<x>/<y>.mvt[.<encoding>]``."""
+
+    def __init__(self, directory: str = TILE_CACHE_DIR):
+        self.directory = directory
+
+    def _path(self, version: int, z: int, x: int, y: int, encoding: Optional[str] = None) -> str:
+        name = f"{y}.mvt.{encoding}" if encoding else f"{y}.mvt"
+        return os.path.join(self.directory, str(version), str(z), str(x), name)
+
+    def get(self, version: int, z: int, x: int, y: int, encoding: Optional[str] = None) -> Optional[bytes]:
+        try:
+            with open(self._path(version, z, x, y, encoding), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, version: int, z: int, x: int, y: int, data: bytes, encoding: Optional[str] = None) -> None:
+        path = self._path(version, z, x, y, encoding)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._prune(keep=version)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)  # atomic, so concurrent readers never see half a tile
+
+    def _prune(self, keep: int) -> None:
+        for name in os.listdir(self.directory):
+            if name.isdigit() and int(name) < keep:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
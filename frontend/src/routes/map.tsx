@@ -1,5 +1,5 @@
 import { createFileRoute } from "@tanstack/react-router"
-import { useState, useRef, useCallback } from "react"
+import { useState, useRef, useCallback, useEffect } from "react"
 import Map, { type Shop } from "../components/map"
 
 // ── Types ────────────────────────────────────────────────────────────────────
@@ -16,6 +16,7 @@ type RiskReport = {
 type LocationDetail = Shop & {
   images: LocationImage[]
   reviews: Review[]
+  reviewsNext?: string | null
   riskReport: RiskReport | null
 }
 
@@ -28,19 +29,44 @@ type LocationQuery = {
   minRating?: number
 }
 
-async function fetchLocations(q: LocationQuery = {}): Promise<Shop[]> {
+type LocationPage = { shops: Shop[]; next: string | null }
+
+// One page of locations; `next` is the X-Next-Cursor for the page after it.
+async function fetchLocations(
+  q: LocationQuery = {},
+  cursor: string | null = null,
+  signal?: AbortSignal,
+): Promise<LocationPage> {
   try {
     const url = new URL("http://localhost:8000/api/locations")
 
     if (q.address?.trim()) url.searchParams.set("address", q.address.trim())
-    if (q.minRating != null) url.searchParams.set("min_rating", String(q.minRating))
+    if (q.minRating != null) url.searchParams.set("minRating", String(q.minRating))
+    if (cursor) url.searchParams.set("cursor", cursor)
 
-    const res = await fetch(url.toString())
+    const res = await fetch(url.toString(), { signal })
     if (!res.ok) throw new Error(`Server error: ${res.status}`)
-    return res.json()
+    return { shops: await res.json(), next: res.headers.get("X-Next-Cursor") }
   } catch (e) {
-    console.error("Failed to fetch locations:", e)
-    return []
+    if (!signal?.aborted) console.error("Failed to fetch locations:", e)
+    return { shops: [], next: null }
+  }
+}
+
+// Follows the cursor from `next` to the last page, handing each page to
+// `onPage` as it arrives. Stops early once `signal` is aborted.
+async function fetchRemainingLocations(
+  q: LocationQuery,
+  next: string | null,
+  onPage: (shops: Shop[]) => void,
+  signal: AbortSignal,
+) {
+  let cursor = next
+  while (cursor && !signal.aborted) {
+    const page = await fetchLocations(q, cursor, signal)
+    if (signal.aborted) return
+    onPage(page.shops)
+    cursor = page.next
   }
 }
 
@@ -55,12 +81,29 @@ async function fetchDetail(id: number): Promise<LocationDetail | null> {
   }
 }
 
+async function fetchMoreReviews(
+  id: number,
+  cursor: string,
+): Promise<{ reviews: Review[]; next: string | null } | null> {
+  try {
+    const url = new URL(`http://localhost:8000/api/locations/${id}/reviews`)
+    url.searchParams.set("cursor", cursor)
+    const res = await fetch(url.toString())
+    if (!res.ok) throw new Error(`Server error: ${res.status}`)
+    return { reviews: await res.json(), next: res.headers.get("X-Next-Cursor") }
+  } catch (e) {
+    console.error("Failed to fetch reviews:", e)
+    return null
+  }
+}
+
 // ── Route ─────────────────────────────────────────────────────────────────────
 
 export const Route = createFileRoute("/map")({
+  // Only the first page; MapPage streams in the rest once it is shown.
   loader: async () => {
-    const shops = await fetchLocations()
-    return { shops }
+    const { shops, next } = await fetchLocations()
+    return { shops, next }
   },
   pendingComponent: () => (
     <div className="flex h-screen w-full items-center justify-center text-black/50">
@@ -104,6 +147,9 @@ function DetailPanel({
   onBack: () => void
 }) {
   const [imgIndex, setImgIndex] = useState(0)
+  const [reviews, setReviews] = useState<Review[]>(detail.reviews)
+  const [reviewsNext, setReviewsNext] = useState(detail.reviewsNext ?? null)
+  const [loadingReviews, setLoadingReviews] = useState(false)
   const images = detail.images.filter((i) => i.image_url)
 
   return (
@@ -206,12 +252,12 @@ function DetailPanel({
         {/* Reviews */}
         <section className="space-y-3">
           <h3 className="font-semibold text-sm">
-            Reviews {detail.reviews.length > 0 ? `(${detail.reviews.length})` : ""}
+            Reviews {(detail.reviewCount ?? reviews.length) > 0 ? `(${detail.reviewCount ?? reviews.length})` : ""}
           </h3>
-          {detail.reviews.length === 0 ? (
+          {reviews.length === 0 ? (
             <p className="text-sm text-black/40">No reviews yet.</p>
           ) : (
-            detail.reviews.map((r) => (
+            reviews.map((r) => (
               <div key={r.review_id} className="rounded-xl border border-black/10 bg-white p-3 space-y-1">
                 {r.rating != null && (
                   <div className="flex items-center gap-1">
@@ -229,6 +275,24 @@ function DetailPanel({
               </div>
             ))
           )}
+          {reviewsNext && (
+            <button
+              className="w-full rounded-xl border border-black/10 bg-white py-2 text-sm font-medium text-black/70 hover:bg-black/5 disabled:opacity-50"
+              type="button"
+              disabled={loadingReviews}
+              onClick={async () => {
+                setLoadingReviews(true)
+                const page = await fetchMoreReviews(detail.id, reviewsNext)
+                if (page) {
+                  setReviews((prev) => [...prev, ...page.reviews])
+                  setReviewsNext(page.next)
+                }
+                setLoadingReviews(false)
+              }}
+            >
+              {loadingReviews ? "Loading…" : "Show more reviews"}
+            </button>
+          )}
         </section>
 
       </div>
@@ -284,7 +348,7 @@ const SIDEBAR_MAX = 700
 const SIDEBAR_DEFAULT = 380
 
 function MapPage() {
-  const { shops } = Route.useLoaderData()
+  const { shops, next } = Route.useLoaderData()
   const [selected, setSelected] = useState<LocationDetail | null>(null)
   const [loadingId, setLoadingId] = useState<number | null>(null)
   const [sidebarWidth, setSidebarWidth] = useState(SIDEBAR_DEFAULT)
@@ -298,24 +362,49 @@ function MapPage() {
   const [minRating, setMinRating] = useState<number | "">("")
   const [isSearching, setIsSearching] = useState(false)
 
-  async function runSearch() {
+  // Pages still loading for the shown results; a new search aborts them.
+  const streaming = useRef<AbortController | null>(null)
+
+  const startStreaming = useCallback(() => {
+    streaming.current?.abort()
+    const controller = new AbortController()
+    streaming.current = controller
+    return controller.signal
+  }, [])
+
+  const appendShops = useCallback(
+    (page: Shop[]) => setShownShops((prev) => [...prev, ...page]),
+    [],
+  )
+
+  useEffect(() => {
+    const signal = startStreaming()
+    void fetchRemainingLocations({}, next, appendShops, signal)
+    return () => streaming.current?.abort()
+  }, [next, appendShops, startStreaming])
+
+  async function showLocations(q: LocationQuery) {
+    const signal = startStreaming()
     setIsSearching(true)
+    const first = await fetchLocations(q, null, signal)
+    if (signal.aborted) return
+    setShownShops(first.shops)
+    setIsSearching(false)
+    await fetchRemainingLocations(q, first.next, appendShops, signal)
+  }
+
+  async function runSearch() {
     setSelected(null)
-    const next = await fetchLocations({
+    await showLocations({
       address,
       minRating: minRating === "" ? undefined : minRating,
     })
-    setShownShops(next)
-    setIsSearching(false)
   }
 
   async function clearSearch() {
     setAddress("")
     setMinRating("")
-    setIsSearching(true)
-    const next = await fetchLocations()
-    setShownShops(next)
-    setIsSearching(false)
+    await showLocations({})
   }
 
 
@@ -375,7 +464,7 @@ function MapPage() {
 
           {/* Detail panel — slides over the list */}
           {selected ? (
-            <DetailPanel detail={selected} onBack={() => setSelected(null)} />
+            <DetailPanel key={selected.id} detail={selected} onBack={() => setSelected(null)} />
           ) : (
             <>
               <div className="sticky top-0 z-10 bg-[rgb(250,250,250)] px-4 py-3 border-b border-black/10 space-y-3">